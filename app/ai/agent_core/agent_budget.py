@@ -0,0 +1,98 @@
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: Iterable[Any]) -> int:
+    """
+    Estimate the token count of messages locally, without calling the model API.
+
+    Args:
+        messages: LangChain messages or plain strings
+
+    Returns:
+        A rough token estimate
+    """
+    chars = 0
+    for msg in messages:
+        content = msg if isinstance(msg, str) else getattr(msg, "content", "")
+        chars += len(content) if isinstance(content, str) else len(str(content))
+        chars += sum(len(str(tool_call.get("args", ""))) for tool_call in getattr(msg, "tool_calls", None) or [])
+    return chars // CHARS_PER_TOKEN
+
+
+class AgentBudget:
+    """
+    Wall-clock, token and iteration limits for answering a single question.
+    A budget counts as exhausted while there is still room for one final
+    answering call, so the agent is never cut off with nothing.
+    """
+
+    def __init__(
+        self,
+        max_iterations: int = 10,
+        max_tokens: int = 2_000_000,
+        deadline_seconds: float = 180.0,
+        reserve_output_tokens: int = 8192,
+        reserve_seconds: float = 20.0,
+    ):
+        self.max_iterations = max_iterations
+        self.max_tokens = max_tokens
+        self.deadline_seconds = deadline_seconds
+        self.reserve_output_tokens = reserve_output_tokens
+        self.reserve_seconds = reserve_seconds
+        self.start()
+
+    def start(self) -> None:
+        """Reset consumption at the start of a question."""
+        self.started_at = time.monotonic()
+        self.iterations = 0
+        self.tokens_used = 0
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def record_call(self, input_tokens: int, output_tokens: int) -> None:
+        self.iterations += 1
+        self.record_tokens(input_tokens, output_tokens)
+
+    def record_tokens(self, input_tokens: int, output_tokens: int) -> None:
+        """Count the tokens of a model call that is not an iteration of the agent loop."""
+        self.tokens_used += input_tokens + output_tokens
+
+    def exhausted_reason(self, next_input_tokens: int) -> Optional[str]:
+        """
+        Check whether another tool-using iteration still fits in the budget.
+
+        Args:
+            next_input_tokens: Estimated input size of the next model call
+
+        Returns:
+            The name of the exhausted budget, or None if the agent may continue
+        """
+        if self.iterations + 1 >= self.max_iterations:
+            return "iteration"
+        if self.elapsed_seconds + self.reserve_seconds >= self.deadline_seconds:
+            return "time"
+        # The next call and a final answering call after it must both fit
+        if self.tokens_used + 2 * (next_input_tokens + self.reserve_output_tokens) > self.max_tokens:
+            return "token"
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "max_iterations": self.max_iterations,
+            "estimated_tokens": self.tokens_used,
+            "max_tokens": self.max_tokens,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "deadline_seconds": self.deadline_seconds,
+            "stop_reason": self.stop_reason,
+        }
@@ -1,12 +1,13 @@
 import os
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, List, Type, TypeVar
+from typing import Any, AsyncGenerator, List, Optional, Type, TypeVar
 
 from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import Tool
 from pydantic import BaseModel
 
+from app.ai.agent_core.agent_budget import AgentBudget
 from app.ai.agent_core.langchain_service import LangChainService
 from app.ai.prompt_loader import PromptLoader
 from app.util.logger import get_logger
@@ -18,24 +19,31 @@ prompt_loader = PromptLoader()
 T = TypeVar('T', bound=BaseModel)
 
 class BaseAgent(ABC):
-    def __init__(self, **kwargs) -> None:
+    def __init__(self, budget: Optional[AgentBudget] = None, **kwargs) -> None:
         logger.info("Initializing BaseAgent")
         system_prompt = self._get_system_prompt(**kwargs)
         logger.debug(system_prompt)
-        self.langchain_service = LangChainService(system_prompt, thinking=self.is_thinking())
+        self.budget = budget
+        self.langchain_service = LangChainService(system_prompt, thinking=self.is_thinking(), budget=budget)
         
     def is_thinking(self) -> bool:
         return True
          
     def on_user_input(self, user_input: str):
         tools = self.create_tools()
-        return self.langchain_service.execute(user_input, tools)
+        return self.langchain_service.execute(user_input, tools, on_step=self.on_step, on_chunk=self.on_chunk)
 
-    def on_user_input_stream(self, user_input: str) -> AsyncGenerator[dict, None]:
+    def on_user_input_stream(self, user_input: str, stream_tokens: bool = True) -> AsyncGenerator[Any, None]:
         tools = self.create_tools()
-        return self.langchain_service.execute_stream(user_input, tools)
+        return self.langchain_service.execute_stream(user_input, tools, on_step=self.on_step, stream_tokens=stream_tokens, on_chunk=self.on_chunk)
    
 
+    def on_step(self, msg: Any) -> None:
+        pass
+
+    def on_chunk(self, chunk: Any) -> None:
+        pass
+
     def get_response_text(self, prompt: str) -> str:
         response = self.on_user_input(prompt)
         text = extract_step_content(response[-1])
@@ -1,14 +1,16 @@
-from collections.abc import AsyncGenerator
-from typing import Type, List, Any, Dict, Optional, TypeVar
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from collections.abc import AsyncGenerator, Iterator
+from typing import Type, List, Any, Callable, Dict, Optional, TypeVar
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage, AIMessageChunk
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import Tool
 from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel
+from app.ai.agent_core.agent_budget import AgentBudget, estimate_tokens
 from app.ai.agent_core.model_provider import ModelProvider
 from dotenv import load_dotenv
 import json
 import asyncio
+import threading
 from app.util.logger import get_logger
 
 DEBUG = False    
@@ -18,19 +20,42 @@ if DEBUG:
 load_dotenv()
 config = RunnableConfig(recursion_limit=100)
 
+_END_OF_STREAM = object()
+
+FINAL_ANSWER_PROMPT = (
+    "You have run out of your {reason} budget and cannot read any more files. "
+    "Give your best final answer now, based on what you have found so far, and refer to the relevant file indices."
+)
+
 
 T = TypeVar('T', bound=BaseModel)
 
 logger = get_logger(__name__)
 
+def answer_text(msg: AIMessage) -> str:
+    """Return the text of a model message or chunk, leaving out thinking and tool call blocks."""
+    if isinstance(msg.content, str):
+        return msg.content
+    parts = []
+    for item in msg.content:
+        if isinstance(item, str):
+            parts.append(item)
+        elif item.get("type") == "text":
+            parts.append(item.get("text", ""))
+    return "".join(parts)
+
+
 class LangChainService:
-    def __init__(self, system_prompt: str, thinking: bool = True, model_type: str = "gemini-2-5-flash"):
+    def __init__(self, system_prompt: str, thinking: bool = True, model_type: str = "gemini-2-5-flash", budget: Optional[AgentBudget] = None):
         model_provider = ModelProvider.getInstance(model_type)
+        self.model_provider = model_provider
         self.model = model_provider.get_model(thinking)
         self.model_type = model_type
+        self.budget = budget
+        self._pending_input_tokens = 0
         
         self.system_prompt = system_prompt
-        self.messages = [SystemMessage(content=[{
+        self.messages: List[BaseMessage] = [SystemMessage(content=[{
             "type": "text",
             "text": self.system_prompt,
             "cache_control": model_provider.get_cache_control(),
@@ -65,46 +90,157 @@ class LangChainService:
                             "args": args
                         })
 
-    def execute(self, input: str, tools: list[Tool] = []) -> List[Any]:
-        agent = self.create_executor(tools)
-        self.messages.append(HumanMessage(content=input)) # type: ignore
-        # Run the agent with proper message formatting
-        steps = []
-        for step in agent.stream(
-            {"messages": self.messages},
-            stream_mode="values",
-            config=config
-        ):
-            msg = step["messages"][-1]
-            self.messages.append(msg)
-            steps.append(msg)
-            
-            # Handle Gemini tool calls
-            self._process_gemini_tool_calls(msg)
-            
-            pretty_print_step(msg)
-        return steps # type: ignore
-
-    async def execute_stream(self, user_input: str, tools: list[Tool] = []) -> AsyncGenerator[dict, None]:
+    def _get_config(self) -> RunnableConfig:
+        if self.budget is None:
+            return config
+        # Each iteration is a model step plus a tools step; the budget stops the loop before this does
+        return RunnableConfig(recursion_limit=2 * self.budget.max_iterations + 2)
+
+    def _handle_step(self, msg: Any, on_step: Optional[Callable[[Any], None]]) -> Any:
+        self.messages.append(msg)
+
+        # Handle Gemini tool calls
+        self._process_gemini_tool_calls(msg)
+
+        if self.budget is not None and isinstance(msg, AIMessage):
+            output_tokens = (msg.usage_metadata["output_tokens"] if msg.usage_metadata else 0) or estimate_tokens([msg])
+            self.budget.record_call(self._pending_input_tokens, output_tokens)
+        if on_step is not None:
+            on_step(msg)
+        pretty_print_step(msg)
+        return msg
+
+    def _budget_stop_reason(self) -> Optional[str]:
+        """Check the budget before the agent makes its next model call."""
+        if self.budget is None or isinstance(self.messages[-1], AIMessage):
+            return None
+        self._pending_input_tokens = estimate_tokens(self.messages)
+        return self.budget.exhausted_reason(self._pending_input_tokens)
+
+    def _force_final_answer(self, reason: str, tools: list[Tool], on_step: Optional[Callable[[Any], None]]) -> Any:
+        logger.info(f"{reason} budget exhausted, forcing a final answer")
+        assert self.budget is not None
+        self.budget.stop_reason = reason
+        self.messages.append(HumanMessage(content=FINAL_ANSWER_PROMPT.format(reason=reason)))
+        self._pending_input_tokens = estimate_tokens(self.messages)
+        # Providers reject tool calls in the history unless tools are declared, so declare them but forbid their use
+        model = self.model.bind_tools(tools, tool_choice=self.model_provider.get_no_tool_choice()) if tools else self.model
+        reply = model.invoke(self.messages)
+        self._process_gemini_tool_calls(reply)
+        if reply.tool_calls:
+            logger.warning("Model still called tools after its budget ran out, answering with its last text instead")
+            reply = AIMessage(content=self._last_text(reply), usage_metadata=reply.usage_metadata)
+        return self._handle_step(reply, on_step)
+
+    def _last_text(self, reply: AIMessage) -> str:
+        """Return the text of the reply, or else the latest text the model wrote during the run."""
+        for msg in [reply, *reversed(self.messages)]:
+            if isinstance(msg, AIMessage):
+                text = answer_text(msg)
+                if text.strip():
+                    return text
+        return ""
+
+    def _run_agent(
+        self,
+        user_input: str,
+        tools: list[Tool],
+        on_step: Optional[Callable[[Any], None]],
+        stream_tokens: bool = False,
+        cancelled: Optional[threading.Event] = None,
+        on_chunk: Optional[Callable[[Any], None]] = None,
+    ) -> Iterator[Any]:
         agent = self.create_executor(tools)
         self.messages.append(HumanMessage(content=user_input)) # type: ignore
-        for step in agent.stream(
+        if self.budget is not None:
+            self.budget.start()
+        seen = len(self.messages)
+        stop_reason = None
+        for mode, payload in agent.stream(
             {"messages": self.messages},
-            stream_mode="values",
-            config=config
+            stream_mode=["values", "messages"] if stream_tokens or on_chunk is not None else ["values"],
+            config=self._get_config()
         ):
-            msg = step["messages"][-1]
-            self.messages.append(msg)
-            
-            # Handle Gemini tool calls
-            self._process_gemini_tool_calls(msg)
-                            
-            yield msg
-            pretty_print_step(msg)    
+            if cancelled is not None and cancelled.is_set():
+                logger.info("Agent run cancelled")
+                return
+            if mode == "messages":
+                # Partial model output; complete messages arrive through "values"
+                chunk, _ = payload
+                if isinstance(chunk, AIMessageChunk):
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                    if stream_tokens:
+                        yield chunk
+                continue
+            for msg in payload["messages"][seen:]:
+                yield self._handle_step(msg, on_step)
+            seen = len(payload["messages"])
+            stop_reason = self._budget_stop_reason()
+            if stop_reason is not None:
+                break
+        if stop_reason is not None:
+            yield self._force_final_answer(stop_reason, tools, on_step)
+
+    def execute(
+        self,
+        input: str,
+        tools: list[Tool] = [],
+        on_step: Optional[Callable[[Any], None]] = None,
+        on_chunk: Optional[Callable[[Any], None]] = None,
+    ) -> List[Any]:
+        return list(self._run_agent(input, tools, on_step, on_chunk=on_chunk))
+
+    async def execute_stream(
+        self,
+        user_input: str,
+        tools: list[Tool] = [],
+        on_step: Optional[Callable[[Any], None]] = None,
+        stream_tokens: bool = True,
+        on_chunk: Optional[Callable[[Any], None]] = None,
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Run the agent in a worker thread and yield its messages as they are produced,
+        along with AIMessageChunks of partial model output if stream_tokens is set.
+        Closing or cancelling the stream stops the agent at its next step.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def put(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The consumer's event loop is already closed
+                cancelled.set()
+
+        def produce() -> None:
+            try:
+                for msg in self._run_agent(user_input, tools, on_step, stream_tokens, cancelled, on_chunk):
+                    put(msg)
+            except Exception as e:
+                put(e)
+            finally:
+                put(_END_OF_STREAM)
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while (item := await queue.get()) is not _END_OF_STREAM:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await producer
+        finally:
+            cancelled.set()
 
     def get_structured_response(self, input: str, output_schema: Type[T]) -> T:
         model_with_tools = self.model.with_structured_output(output_schema)
-        return model_with_tools.invoke(input) # type: ignore
+        response = model_with_tools.invoke(input)
+        if self.budget is not None:
+            # A follow-up to the answer, not a step of the agent loop
+            self.budget.record_tokens(estimate_tokens([input]), estimate_tokens([str(response)]))
+        return response # type: ignore
         
 def pretty_print_step(msg):
     if hasattr(msg, "name") and msg.name is not None:
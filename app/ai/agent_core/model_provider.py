@@ -30,6 +30,11 @@ class ModelProvider(ABC):
         """Return the configured model instance."""
         pass
 
+    @abstractmethod
+    def get_no_tool_choice(self) -> Any:
+        """Return the tool_choice that declares tools but forbids calling them."""
+        pass
+
 class AnthropicClaude3_7ModelProvider(ModelProvider):
     def get_model_config(self, thinking: bool = True) -> Dict[str, Any]:
         """Return Anthropic Claude 3.7 configuration."""
@@ -49,6 +54,10 @@ class AnthropicClaude3_7ModelProvider(ModelProvider):
         """Return a configured ChatAnthropic instance."""
         return ChatAnthropic(**self.get_model_config(thinking))
 
+    def get_no_tool_choice(self) -> Dict[str, Any]:
+        """Return Claude's tool choice that disables tool use."""
+        return {"type": "none"}
+
 class GeminiFlashModelProvider(ModelProvider):
     def get_model_config(self, thinking: bool = True) -> Dict[str, Any]:
         """Return Gemini 2.5 Flash configuration."""
@@ -72,3 +81,7 @@ class GeminiFlashModelProvider(ModelProvider):
         """Return a configured ChatGoogleGenerativeAI instance."""
         return ChatGoogleGenerativeAI(**self.get_model_config(thinking))
 
+    def get_no_tool_choice(self) -> str:
+        """Return Gemini's function calling mode that disables tool use."""
+        return "none"
+
@@ -1,12 +1,26 @@
+import asyncio
+import re
+import time
+from contextlib import aclosing
+from langchain_core.messages import AIMessageChunk
 from langchain_core.tools import Tool
 from pydantic import BaseModel, Field
-from typing import List
-from app.ai.agent_core.base_agent import BaseAgent
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from app.ai.agent_core.agent_budget import AgentBudget
+from app.ai.agent_core.base_agent import BaseAgent, extract_step_content
+from app.ai.agent_core.langchain_service import answer_text
+from app.ai.tools.prefetcher import INDEX_REFERENCE_PATTERN, FilePrefetcher, message_text
 from app.ai.tools.read_code import CodeReader
+from app.ai.tools.repo_map import RepoMap
+from app.util.import_graph import ImportCache
 from app.util.logger import get_logger
 
 logger = get_logger(__name__)
 
+PREFETCHED_CENTRAL_FILES = 8
+
+READ_FILE_HEADER_PATTERN = re.compile(r'^<(?:file|diff) path="([^"]+)" index="(\d+)">', re.MULTILINE)
+
 class RelevantFiles(BaseModel):
     relevant_files: List[int] = Field(description="List of relevant file indices that further AI agents should read. Must NOT be empty")
 
@@ -14,17 +28,106 @@ class RelevantFiles(BaseModel):
 
 class CodeLocationAgent(BaseAgent):
     
-    def __init__(self, code_reader: CodeReader, max_iterations: int = 10):
-      super().__init__(codebase=code_reader.get_file_structure())
+    def __init__(
+        self,
+        code_reader: CodeReader,
+        max_iterations: int = 10,
+        max_tokens: int = 2_000_000,
+        deadline_seconds: float = 180.0,
+        repo_map_tokens: int = 2000,
+        import_cache: Optional[ImportCache] = None,
+    ):
+      budget = AgentBudget(max_iterations=max_iterations, max_tokens=max_tokens, deadline_seconds=deadline_seconds)
+      self.repo_map = RepoMap(code_reader, max_tokens=repo_map_tokens, import_cache=import_cache)
+      super().__init__(budget=budget, codebase=code_reader.get_file_structure(), repo_map=self.repo_map.render())
       self.code_reader = code_reader
       self.max_iterations = max_iterations
+      self.prefetcher = FilePrefetcher(code_reader)
 
     def answer_question(self, question: str) -> str:
+        self.prefetcher.prefetch(self.repo_map.top_files(PREFETCHED_CENTRAL_FILES))
+        self.prefetcher.observe_text(question)
         answer = self.get_response_text(question)
+        return self._append_relevant_files(answer)
+
+    async def answer_question_stream(self, question: str, started: Optional[float] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Answer a question while reporting progress as it happens.
+
+        Args:
+            question: The question to answer
+            started: time.monotonic() when the caller received the question, so the timings include its setup
+
+        Yields:
+            "file_read" events for every file the agent opens, "candidates" events whenever the
+            set of files the agent is considering grows, "answer_delta" events with partial model
+            text, and a final "answer" event with the answer, budget and timings
+        """
+        started = started if started is not None else time.monotonic()
+        first_output: Optional[float] = None
+        candidates: Dict[int, None] = {}
+        last_msg = None
+        self.prefetcher.prefetch(self.repo_map.top_files(PREFETCHED_CENTRAL_FILES))
+        self.prefetcher.observe_text(question)
+        # aclosing stops the agent as soon as the consumer cancels or stops iterating
+        async with aclosing(self.on_user_input_stream(question)) as stream:
+            async for msg in stream:
+                if not isinstance(msg, AIMessageChunk):
+                    last_msg = msg
+                for event in self._step_events(msg, candidates):
+                    if first_output is None:
+                        first_output = time.monotonic() - started
+                    yield event
+        answer = extract_step_content(last_msg) if last_msg is not None else ""
+        answer = await asyncio.to_thread(self._append_relevant_files, answer)
+        total = time.monotonic() - started
+        yield {
+            "type": "answer",
+            "answer": answer,
+            "budget": self.get_budget_report(),
+            "timings": {
+                "time_to_first_output_seconds": round(first_output if first_output is not None else total, 3),
+                "total_seconds": round(total, 3),
+            },
+        }
+
+    def _append_relevant_files(self, answer: str) -> str:
         relevant_files_question = f"{self.code_reader.get_file_structure()} List indices of all files that are relevant to the answer, esp the ones you referred to in your answer: {answer}"
         relevant_files = self.get_structured_response(relevant_files_question, RelevantFiles).relevant_files
 
         return f"{answer}\n\nRelevant files:\n{self.code_reader.get_file_structure(relevant_files)}"
+
+    def _step_events(self, msg: Any, candidates: Dict[int, None]) -> List[Dict[str, Any]]:
+        if isinstance(msg, AIMessageChunk):
+            text = answer_text(msg)
+            return [{"type": "answer_delta", "text": text}] if text else []
+        events: List[Dict[str, Any]] = []
+        mentioned: List[int] = []
+        if getattr(msg, "type", None) == "tool":
+            for relative_path, index in READ_FILE_HEADER_PATTERN.findall(message_text(msg)):
+                events.append({"type": "file_read", "index": int(index), "path": relative_path})
+                mentioned.append(int(index))
+        else:
+            mentioned.extend(int(index) for index in INDEX_REFERENCE_PATTERN.findall(message_text(msg)))
+            for tool_call in getattr(msg, "tool_calls", None) or []:
+                mentioned.extend(i for i in tool_call.get("args", {}).get("indices", []) if isinstance(i, int))
+        new_candidates = [i for i in mentioned if i not in candidates and self.code_reader.is_valid_index(i)]
+        if new_candidates:
+            candidates.update(dict.fromkeys(new_candidates))
+            files = [{"index": i, "path": self.code_reader.relative_path(i)} for i in candidates]
+            events.append({"type": "candidates", "files": files})
+        return events
+
+    def get_budget_report(self) -> Dict[str, Any]:
+        """Return how much of the budget the last question consumed."""
+        assert self.budget is not None
+        return self.budget.report()
     
+    def on_step(self, msg: Any) -> None:
+        self.prefetcher.observe(msg)
+
+    def on_chunk(self, chunk: Any) -> None:
+        self.prefetcher.observe_chunk(chunk)
+
     def create_tools(self) -> list[Tool]:
         return self.code_reader.get_tools() # type: ignore
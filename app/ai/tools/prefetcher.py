@@ -0,0 +1,133 @@
+import re
+from typing import Any, Dict, List
+
+from app.ai.tools.read_code import CodeReader
+from app.util.import_graph import ImportResolver
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+FILE_BLOCK_PATTERN = re.compile(r'<file path="([^"]+)" index="(\d+)">\n(.*?)\n</file>', re.DOTALL)
+INDEX_REFERENCE_PATTERN = re.compile(r'\[(\d+)\]')
+PATH_TOKEN_PATTERN = re.compile(r'[\w./-]+\.\w+')
+COMPLETE_INDEX_PATTERN = re.compile(r'(\d+)[\s,\]]')
+TOKEN_BOUNDARY_PATTERN = re.compile(r'[\s\]]')
+
+
+class FilePrefetcher:
+    """
+    Warms the CodeReader content cache with files the agent is likely to open next,
+    so that the following read_code call is served from memory.
+    """
+
+    def __init__(self, code_reader: CodeReader, max_prefetch: int = 32):
+        self.code_reader = code_reader
+        self.max_prefetch = max_prefetch
+        self.import_resolver = ImportResolver(code_reader.relative_paths())
+        self._index_by_name: Dict[str, int] = {}
+        self._build_name_table()
+        self._partial_text = ""
+        self._partial_args = ""
+        self._scanned_text = 0
+        self._scanned_args = 0
+
+    def _build_name_table(self) -> None:
+        duplicate_names = set()
+        for index, file_path in enumerate(self.code_reader.file_paths):
+            if file_path.name in self._index_by_name:
+                duplicate_names.add(file_path.name)
+            self._index_by_name[file_path.name] = index
+        for name in duplicate_names:
+            del self._index_by_name[name]
+
+    def observe(self, msg: Any) -> None:
+        """
+        Inspect an agent step and prefetch files it hints at.
+
+        Args:
+            msg: A message produced by the agent loop
+        """
+        self._reset_partial()
+        text = message_text(msg)
+        if getattr(msg, "type", None) == "tool":
+            self.prefetch(self._imported_indices(text))
+        else:
+            self.observe_text(text)
+
+    def observe_chunk(self, chunk: Any) -> None:
+        """
+        Prefetch from a model reply while it is still being streamed: files the model
+        mentions and the indices of a read_code call whose arguments are still being
+        written, so the reads start before the tool runs.
+
+        Args:
+            chunk: An AIMessageChunk of the reply in progress
+        """
+        self._partial_text += message_text(chunk)
+        for tool_call_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+            self._partial_args += tool_call_chunk.get("args") or ""
+        indices = self._mentioned_indices(self._take_complete_text())
+        indices.extend(int(index) for index in COMPLETE_INDEX_PATTERN.findall(self._take_complete_args()))
+        self.prefetch([i for i in indices if self.code_reader.is_valid_index(i)])
+
+    def _take_complete_text(self) -> str:
+        """Return the text streamed since the last call, up to the last token that is known to be complete."""
+        boundaries = list(TOKEN_BOUNDARY_PATTERN.finditer(self._partial_text, self._scanned_text))
+        if not boundaries:
+            return ""
+        start, self._scanned_text = self._scanned_text, boundaries[-1].end()
+        return self._partial_text[start:self._scanned_text]
+
+    def _take_complete_args(self) -> str:
+        end = max(self._partial_args.rfind(delimiter) for delimiter in (",", "]", " ")) + 1
+        if end <= self._scanned_args:
+            return ""
+        start, self._scanned_args = self._scanned_args, end
+        return self._partial_args[start:end]
+
+    def _reset_partial(self) -> None:
+        self._partial_text = ""
+        self._partial_args = ""
+        self._scanned_text = 0
+        self._scanned_args = 0
+
+    def observe_text(self, text: str) -> None:
+        """Prefetch files referenced by index or by path in free text."""
+        self.prefetch(self._mentioned_indices(text))
+
+    def prefetch(self, indices: List[int]) -> None:
+        """Prefetch candidate files, skipping hidden and already cached ones."""
+        candidates = [i for i in dict.fromkeys(indices) if i not in self.code_reader.demoted and not self.code_reader.is_cached(i)]
+        if candidates:
+            logger.debug(f"Prefetching {len(candidates[:self.max_prefetch])} files")
+            self.code_reader.prefetch(candidates[:self.max_prefetch])
+
+    def _mentioned_indices(self, text: str) -> List[int]:
+        indices = [int(match) for match in INDEX_REFERENCE_PATTERN.findall(text)]
+        for token in PATH_TOKEN_PATTERN.findall(text):
+            token = token.lstrip('./')
+            index = self.import_resolver.index_by_path.get(token, self._index_by_name.get(token))
+            if index is not None:
+                indices.append(index)
+        return [i for i in indices if self.code_reader.is_valid_index(i)]
+
+    def _imported_indices(self, text: str) -> List[int]:
+        indices: List[int] = []
+        for relative_path, _, content in FILE_BLOCK_PATTERN.findall(text):
+            indices.extend(self.import_resolver.resolve(relative_path, content))
+        return indices
+
+
+def message_text(msg: Any) -> str:
+    content = getattr(msg, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for item in content:
+        if isinstance(item, str):
+            parts.append(item)
+        elif item.get("type") == "text":
+            parts.append(item.get("text", ""))
+        elif item.get("type") == "thinking":
+            parts.append(item.get("thinking", ""))
+    return "\n".join(parts)
@@ -1,63 +1,340 @@
+import hashlib
 import json
-from typing import Dict, List, Callable, Any
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Generator, List, Callable, Any, Tuple
 from pathlib import Path
 from langchain_core.tools import Tool, BaseTool
 
 from langchain_core.tools import tool
 
-from app.util.file_traverser import FileTraverser
+from app.util.content_classifier import ContentClassifier, classification_path_for
+from app.util.diff_scope import DiffScope
+from app.util.content_pack import ContentPack, PackedSource, open_pack
+from app.util.file_source import FileSource, WorkingTreeSource
+from app.util.git_source import GitSource
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 class CodeReader:
-    def __init__(self, base_path: str):
+    def __init__(
+        self,
+        base_path: str,
+        revision: str | None = None,
+        pack_path: str | None = None,
+        update_pack: bool = True,
+        include_generated: bool = False,
+        classifier: ContentClassifier | None = None,
+        scope: DiffScope | None = None,
+        max_workers: int = 8,
+    ):
         """
         Initialize the CodeReader with a base path.
         
         Args:
             base_path: The base path to read files from
+            revision: Optional git revision to read instead of the working tree
+            pack_path: Optional content pack to start from, written in the background if missing
+            update_pack: Rewrite the pack in the background when it is missing or outdated; off for packs another process maintains
+            include_generated: List generated, vendored and lock files (after the regular files) instead of hiding them
+            classifier: Classifier for generated files, shared to reuse its cache across readers
+            scope: Optional change to restrict the files to, along with their direct import neighbors
+            max_workers: Number of threads used for concurrent and prefetched reads
         """
         self.base_path = Path(base_path)
+        self.revision = revision
+        # A scoped reader lists its files from git, and a scoped file table must not become the pack
+        self.pack_path = Path(pack_path) if pack_path and not revision and scope is None else None
+        self.update_pack = update_pack
+        self.source: FileSource = self._create_source()
+        self.include_generated = include_generated
+        self.classifier = classifier if classifier is not None else ContentClassifier()
+        self.scope = scope
         self.file_paths: List[Path] = []
+        self.demoted: Dict[int, str] = {}
+        self._index_version: str | None = None
+        self._content_cache: Dict[int, str] = {}
+        self._prefetching: Dict[int, Future] = {}
+        self._cache_lock = threading.Lock()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="code-reader")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=max(1, max_workers // 2), thread_name_prefix="code-prefetch")
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._writing_pack = False
+        self.pack_writer: threading.Thread | None = None
         self._build_file_list()
+        if self._pack_needs_update():
+            self._start_pack_writer()
+
+    def _create_source(self) -> FileSource:
+        if self.revision:
+            return GitSource(str(self.base_path), self.revision)
+        working_tree = WorkingTreeSource(str(self.base_path))
+        pack = open_pack(self.pack_path, str(self.base_path)) if self.pack_path is not None else None
+        if pack is None:
+            return working_tree
+        logger.info(f"Serving {len(pack.entries)} files from content pack {self.pack_path}")
+        return PackedSource(str(self.base_path), pack, working_tree)
+
+    def _pack_needs_update(self) -> bool:
+        if self.pack_path is None or not self.update_pack or self.pack_writer is not None:
+            return False
+        return not isinstance(self.source, PackedSource) or self.source.outdated
+
+    def _start_pack_writer(self) -> None:
+        self._writing_pack = True
+        self.pack_writer = threading.Thread(target=self._write_pack_in_background, daemon=True)
+        self.pack_writer.start()
+
+    def save_pack(self, pack_path: Path, compress: bool = False) -> None:
+        """
+        Persist the file table and file contents into a content pack, and the classification of the files next to it.
+
+        Args:
+            pack_path: Where to write the pack
+            compress: Whether to compress the stored contents
+        """
+        try:
+            ContentPack.write(pack_path, self.source, self.file_paths, compress)
+            self.classifier.save(classification_path_for(pack_path), self.source, self.file_paths)
+        except Exception as e:
+            logger.error(f"Error writing content pack {pack_path}: {e}")
+
+    def _write_pack_in_background(self) -> None:
+        assert self.pack_path is not None
+        try:
+            self.save_pack(self.pack_path)
+        finally:
+            with self._close_lock:
+                self._writing_pack = False
+                closed = self._closed
+            if closed:
+                self.source.close()
     
     def _build_file_list(self) -> None:
-        """Build a list of files using FileTraverser."""
-        traverser = FileTraverser(str(self.base_path))
-        self.file_paths = list(traverser)
+        """Build a list of files from the configured source."""
+        if self.scope is not None:
+            self.file_paths = self.scope.list_files(self.source, self.revision)
+        else:
+            self.file_paths = self.source.list_files()
+        if self.pack_path is not None:
+            # Spares sniffing every file again after a restart
+            self.classifier.load(classification_path_for(self.pack_path), str(self.base_path))
+        self.demoted = self.classifier.classify_all(self.source, self.file_paths)
+        self._index_version = None
+
+    def relative_path(self, index: int) -> str:
+        """Return the POSIX path of a file relative to the base path."""
+        return self.file_paths[index].relative_to(self.base_path).as_posix()
+
+    def relative_paths(self) -> List[str]:
+        """Return the POSIX paths of all files relative to the base path, in index order."""
+        return [file_path.relative_to(self.base_path).as_posix() for file_path in self.file_paths]
+
+    def get_index_version(self) -> str:
+        """
+        Get an identifier of the current file table and file versions, for caching
+        results derived from the whole index.
+
+        Returns:
+            A hash that changes whenever a file is added, removed or modified
+        """
+        if self._index_version is None:
+            digest = hashlib.sha1(str(self.base_path.resolve()).encode('utf-8'))
+            for relative_path, file_path in zip(self.relative_paths(), self.file_paths):
+                digest.update(f"{relative_path}\0{self.source.fingerprint(file_path)}\n".encode('utf-8'))
+            self._index_version = digest.hexdigest()
+        return self._index_version
     
     def get_file_structure(self, indices: List[int] | None = None) -> str:
         """
         Get a string representation of the file structure with indices.
         
         Args:
-            indices: Optional list of indices to include in the structure. If None, include all files.
+            indices: Optional list of indices to include in the structure. If None, include all files,
+                hiding or demoting generated, vendored and lock files.
             
         Returns:
             A string representation of the file structure
         """
-        result = []
-        for i, file_path in enumerate(self.file_paths):
-            # Skip files with indices not in the provided list
-            if indices is not None and i not in indices:
-                continue
-                
-            relative_path = file_path.relative_to(self.base_path)
-            
-            # Get file size with appropriate units
-            size_bytes = file_path.stat().st_size
-            if size_bytes < 1024:
-                size_str = f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                size_str = f"{size_bytes / 1024:.1f} KB"
-            elif size_bytes < 1024 * 1024 * 1024:
-                size_str = f"{size_bytes / (1024 * 1024):.1f} MB"
-            else:
-                size_str = f"{size_bytes / (1024 * 1024 * 1024):.1f} GB"
-            
-            result.append(f"[{i}] {relative_path} ({size_str})")
-        
+        if indices is not None:
+            return "\n".join(self._format_entry(i, file_path) for i, file_path in enumerate(self.file_paths) if i in indices)
+
+        result = [self._format_entry(i, file_path) for i, file_path in enumerate(self.file_paths) if i not in self.demoted]
+        if not self.demoted:
+            return "\n".join(result)
+        if self.include_generated:
+            result.append("\nGenerated, vendored and lock files:")
+            result.extend(f"{self._format_entry(i, self.file_paths[i])} [{reason}]" for i, reason in sorted(self.demoted.items()))
+        else:
+            result.append(f"({len(self.demoted)} generated, vendored or lock files hidden)")
         return "\n".join(result)
+
+    def _format_entry(self, i: int, file_path: Path) -> str:
+        relative_path = file_path.relative_to(self.base_path)
+        
+        # Get file size with appropriate units
+        size_bytes = self.source.file_size(file_path)
+        if size_bytes < 1024:
+            size_str = f"{size_bytes} B"
+        elif size_bytes < 1024 * 1024:
+            size_str = f"{size_bytes / 1024:.1f} KB"
+        elif size_bytes < 1024 * 1024 * 1024:
+            size_str = f"{size_bytes / (1024 * 1024):.1f} MB"
+        else:
+            size_str = f"{size_bytes / (1024 * 1024 * 1024):.1f} GB"
+        
+        entry = f"[{i}] {relative_path} ({size_str})"
+        if self.scope is not None and relative_path.as_posix() in self.scope.changed:
+            entry += " [changed]"
+        return entry
     
+    def is_valid_index(self, index: int) -> bool:
+        return 0 <= index < len(self.file_paths)
+
+    def is_cached(self, index: int) -> bool:
+        with self._cache_lock:
+            return index in self._content_cache
+
+    def read_file(self, index: int) -> str:
+        """
+        Read a file by index, serving it from the content cache when possible.
+
+        Args:
+            index: Index of the file to read
+
+        Returns:
+            The file contents
+        """
+        with self._cache_lock:
+            cached = self._content_cache.get(index)
+            pending = self._prefetching.get(index)
+        if cached is not None:
+            return cached
+        if pending is not None:
+            cached = self._await_prefetch(index, pending)
+            if cached is not None:
+                return cached
+        return self._load(index)
+
+    def _await_prefetch(self, index: int, pending: Future) -> str | None:
+        """Wait for a prefetch of the file that already started; one that is still queued is dropped instead."""
+        if pending.cancel():
+            with self._cache_lock:
+                self._prefetching.pop(index, None)
+            return None
+        pending.result()
+        with self._cache_lock:
+            return self._content_cache.get(index)
+
+    def _load(self, index: int) -> str:
+        content = self.source.read_text(self.file_paths[index])
+        with self._cache_lock:
+            self._content_cache[index] = content
+        return content
+
+    def prefetch(self, indices: List[int]) -> None:
+        """
+        Warm the content cache in the background without waiting for the reads.
+
+        Args:
+            indices: File indices that are likely to be read next
+        """
+        for index in indices:
+            if not self.is_valid_index(index):
+                continue
+            with self._cache_lock:
+                if index in self._content_cache or index in self._prefetching:
+                    continue
+                self._prefetching[index] = self._prefetch_executor.submit(self._prefetch_one, index)
+
+    def _prefetch_one(self, index: int) -> None:
+        try:
+            self._load(index)
+        except Exception as e:
+            logger.debug(f"Prefetch of {self.file_paths[index]} failed: {e}")
+        finally:
+            with self._cache_lock:
+                self._prefetching.pop(index, None)
+
+    def _format_file(self, index: int) -> str:
+        if not self.is_valid_index(index):
+            return f'<error>Invalid index: {index}</error>'
+        relative_path = self.file_paths[index].relative_to(self.base_path)
+        if self.scope is not None and self.scope.hunks_only:
+            hunks = self.scope.get_hunks(relative_path.as_posix())
+            if hunks is not None:
+                return f'<diff path="{relative_path}" index="{index}">\n{hunks}\n</diff>'
+        try:
+            content = self.read_file(index)
+            return f'<file path="{relative_path}" index="{index}">\n{content}\n</file>'
+        except Exception as e:
+            return f'<file path="{relative_path}" index="{index}">\nError reading file: {e}\n</file>'
+
+    def map_contents(self, indices: List[int]) -> Generator[Tuple[int, str, str], None, None]:
+        """
+        Read many files concurrently without keeping them in the content cache,
+        for passes over the whole codebase.
+
+        Args:
+            indices: File indices to read
+
+        Yields:
+            (index, relative path, content) for each file that could be read, in order.
+            Reads are submitted a few at a time, so a consumer that stops early leaves the rest unread
+        """
+        def read(index: int) -> Tuple[int, str, str] | None:
+            try:
+                return index, self.relative_path(index), self.source.read_text(self.file_paths[index])
+            except Exception as e:
+                logger.debug(f"Skipping unreadable file {self.file_paths[index]}: {e}")
+                return None
+
+        remaining = iter(indices)
+        pending = deque(self._executor.submit(read, index) for index in islice(remaining, 2 * self.max_workers))
+        try:
+            while pending:
+                item = pending.popleft().result()
+                for index in islice(remaining, 1):
+                    pending.append(self._executor.submit(read, index))
+                if item is not None:
+                    yield item
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def read_files(self, indices: List[int]) -> str:
+        """
+        Read several files concurrently and format them for the agent.
+
+        Args:
+            indices: A list of file indices to read
+
+        Returns:
+            The formatted contents of the files, in the requested order
+        """
+        return "\n\n".join(self._executor.map(self._format_file, indices))
+
+    def close(self) -> None:
+        """
+        Stop worker threads and release the file source, once a background pack write no longer reads from it.
+        Files are checked against the pack lazily, so the pack is rewritten here if any turned out to have changed.
+        """
+        self._executor.shutdown(wait=False)
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        with self._close_lock:
+            self._closed = True
+            if self._pack_needs_update():
+                self._start_pack_writer()
+            writing_pack = self._writing_pack
+        if not writing_pack:
+            self.source.close()
+
     def get_tools(self) -> List[BaseTool]:
         """
         Get the tools provided by this class.
@@ -76,20 +353,6 @@ class CodeReader:
             Returns:
                 The contents of the specified files with their paths and indices
             """
-            result = []
-            
-            for index in indices:
-                if 0 <= index < len(self.file_paths):
-                    file_path = self.file_paths[index]
-                    try:
-                        content = file_path.read_text(encoding='utf-8')
-                        relative_path = file_path.relative_to(self.base_path)
-                        result.append(f'<file path="{relative_path}" index="{index}">\n{content}\n</file>')
-                    except Exception as e:
-                        result.append(f'<file path="{file_path.relative_to(self.base_path)}" index="{index}">\nError reading file: {e}\n</file>')
-                else:
-                    result.append(f'<error>Invalid index: {index}</error>')
-            
-            return "\n\n".join(result)
+            return self.read_files(indices)
         
         return [read_code]
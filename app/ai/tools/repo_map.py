@@ -0,0 +1,197 @@
+import ast
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.ai.agent_core.agent_budget import estimate_tokens
+from app.ai.tools.read_code import CodeReader
+from app.util.import_graph import ImportCache, ImportResolver, build_import_edges, has_imports, pagerank, parse_imports
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+JS_SYMBOL_PATTERN = re.compile(r'^(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\*?|class|interface|type|enum|const)\s+(\w+)', re.MULTILINE)
+GO_SYMBOL_PATTERN = re.compile(r'^(?:func\s+(?:\([^)]*\)\s*)?|type\s+)(\w+)', re.MULTILINE)
+JAVA_SYMBOL_PATTERN = re.compile(r'^\s*(?:(?:public|protected|private|abstract|final|static|sealed|data|open)\s+)*(?:class|interface|enum|record|object)\s+(\w+)', re.MULTILINE)
+
+MAX_SYMBOLS_PER_FILE = 12
+MAX_CACHED_GRAPHS = 8
+
+
+class RepoMap:
+    """
+    Ranks files by how central they are in the import graph and renders a
+    token-bounded map of the most central files and their key symbols.
+    """
+
+    _cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(
+        self,
+        code_reader: CodeReader,
+        max_tokens: int = 2000,
+        import_cache: Optional[ImportCache] = None,
+        max_parse_seconds: float = 10.0,
+        max_parse_bytes: int = 512 * 1024,
+    ):
+        """
+        Initialize the RepoMap.
+
+        Args:
+            code_reader: Reader over the codebase to map
+            max_tokens: Upper bound on the estimated size of the rendered map
+            import_cache: Parsed imports shared across readers and runs; files are only parsed again when they change
+            max_parse_seconds: Time after which files missing from the import cache are left out of the graph
+            max_parse_bytes: Files larger than this are not parsed for imports
+        """
+        self.code_reader = code_reader
+        self.max_tokens = max_tokens
+        self.import_cache = import_cache if import_cache is not None else ImportCache()
+        self.max_parse_seconds = max_parse_seconds
+        self.max_parse_bytes = max_parse_bytes
+        self._partial: Optional[Tuple[str, Tuple[np.ndarray, np.ndarray]]] = None
+
+    def get_scores(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the centrality score and import count of every file, cached per index version.
+
+        Returns:
+            PageRank scores and the number of files importing each file
+        """
+        version = self.code_reader.get_index_version()
+        with self._cache_lock:
+            if version in self._cache:
+                self._cache.move_to_end(version)
+                return self._cache[version]
+        # A graph cut short by the parse budget is only reused by this map, later maps parse further
+        if self._partial is not None and self._partial[0] == version:
+            return self._partial[1]
+        scores, complete = self._compute_scores()
+        if not complete:
+            self._partial = (version, scores)
+        else:
+            with self._cache_lock:
+                self._cache[version] = scores
+                while len(self._cache) > MAX_CACHED_GRAPHS:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def _compute_scores(self) -> Tuple[Tuple[np.ndarray, np.ndarray], bool]:
+        relative_paths = self.code_reader.relative_paths()
+        files, complete = self._collect_imports(relative_paths)
+        sources, targets = build_import_edges(ImportResolver(relative_paths), files)
+        node_count = len(relative_paths)
+        logger.info(f"Import graph has {node_count} files and {len(sources)} edges")
+        return (pagerank(node_count, sources, targets), np.bincount(targets, minlength=node_count)), complete
+
+    def _collect_imports(self, relative_paths: List[str]) -> Tuple[List[Tuple[int, str, List[str]]], bool]:
+        """Take each file's imports from the cache, parsing the missing ones until the time budget runs out."""
+        deadline = time.monotonic() + self.max_parse_seconds
+        self.import_cache.load()
+        files: List[Tuple[int, str, List[str]]] = []
+        fingerprints: Dict[int, Hashable] = {}
+        for index, relative_path in enumerate(relative_paths):
+            if index in self.code_reader.demoted or not has_imports(relative_path):
+                continue
+            file_path = self.code_reader.file_paths[index]
+            try:
+                fingerprint = self.code_reader.source.fingerprint(file_path)
+                references = self.import_cache.get(relative_path, fingerprint)
+                if references is None and self.code_reader.source.file_size(file_path) > self.max_parse_bytes:
+                    continue
+            except Exception as e:
+                logger.debug(f"Skipping {relative_path} in the import graph: {e}")
+                continue
+            if references is None:
+                fingerprints[index] = fingerprint
+            else:
+                files.append((index, relative_path, references))
+        cached = len(files)
+        parsed = 0
+        complete = True
+        with closing(self.code_reader.map_contents(list(fingerprints))) as contents:
+            for index, relative_path, content in contents:
+                if time.monotonic() >= deadline:
+                    complete = False
+                    break
+                references = parse_imports(relative_path, content)
+                self.import_cache.put(relative_path, fingerprints[index], references)
+                files.append((index, relative_path, references))
+                parsed += 1
+        if parsed:
+            self.import_cache.save()
+        if not complete:
+            logger.warning(f"Parse budget ran out, {len(fingerprints) - parsed} files are left out of the import graph for now")
+        logger.info(f"Took imports of {cached} files from the cache, parsed {parsed}")
+        return files, complete
+
+    def top_files(self, count: int) -> List[int]:
+        """Return the indices of the most central files that are imported at least once."""
+        scores, import_counts = self.get_scores()
+        ranked = np.argsort(-scores, kind='stable')
+        return [int(i) for i in ranked[import_counts[ranked] > 0][:count]]
+
+    def render(self) -> str:
+        """
+        Render the most central files with their key symbols, most central first.
+
+        Returns:
+            The repo map, within the token budget
+        """
+        _, import_counts = self.get_scores()
+        lines: List[str] = []
+        used_tokens = 0
+        for index in self.top_files(len(self.code_reader.file_paths)):
+            line = self._render_file(index, int(import_counts[index]))
+            line_tokens = estimate_tokens([line]) + 1
+            if used_tokens + line_tokens > self.max_tokens:
+                break
+            lines.append(line)
+            used_tokens += line_tokens
+        return "\n".join(lines) if lines else "(no imports between files found)"
+
+    def _render_file(self, index: int, import_count: int) -> str:
+        relative_path = self.code_reader.relative_path(index)
+        line = f"[{index}] {relative_path} (imported by {import_count})"
+        try:
+            symbols = extract_symbols(relative_path, self.code_reader.read_file(index))
+        except Exception as e:
+            logger.debug(f"Could not extract symbols from {relative_path}: {e}")
+            symbols = []
+        return f"{line}: {', '.join(symbols)}" if symbols else line
+
+
+def extract_symbols(relative_path: str, content: str) -> List[str]:
+    """Return the top-level classes, functions and types defined in a file."""
+    if relative_path.endswith('.py'):
+        return _python_symbols(content)[:MAX_SYMBOLS_PER_FILE]
+    if relative_path.endswith(('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')):
+        pattern = JS_SYMBOL_PATTERN
+    elif relative_path.endswith('.go'):
+        pattern = GO_SYMBOL_PATTERN
+    elif relative_path.endswith(('.java', '.kt', '.scala')):
+        pattern = JAVA_SYMBOL_PATTERN
+    else:
+        return []
+    return list(dict.fromkeys(pattern.findall(content)))[:MAX_SYMBOLS_PER_FILE]
+
+
+def _python_symbols(content: str) -> List[str]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            methods = [child.name for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and not child.name.startswith('_')]
+            symbols.append(f"{node.name}({', '.join(methods)})" if methods else node.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith('_'):
+            symbols.append(node.name)
+    return symbols
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.util.file_source import FileSource
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ContentClassifier:
+    """
+    Spots generated, vendored, minified and lock files that are rarely worth
+    reading, looking only at the path and size and, where sources can read them
+    cheaply, the first few KB of each file.
+    """
+
+    LOCKFILE_NAMES = {
+        'uv.lock', 'poetry.lock', 'Pipfile.lock', 'pdm.lock',
+        'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'bun.lockb',
+        'Cargo.lock', 'Gemfile.lock', 'composer.lock', 'go.sum', 'flake.lock',
+        'mix.lock', 'Podfile.lock', 'packages.lock.json', 'pubspec.lock',
+    }
+
+    GENERATED_SUFFIXES = (
+        '_pb2.py', '_pb2_grpc.py', '_pb2.pyi', '.pb.go', '.pb.cc', '.pb.h', '_grpc.pb.go',
+        '.g.dart', '.freezed.dart', '.designer.cs', '.generated.ts', '.gen.go',
+    )
+
+    MINIFIED_SUFFIXES = ('.min.js', '.min.css', '.min.mjs', '.bundle.js', '.map')
+
+    SNAPSHOT_SUFFIXES = ('.snap', '.ambr')
+
+    SNAPSHOT_DIRS = {'__snapshots__'}
+
+    VENDOR_DIRS = {'vendor', 'vendored', 'third_party', 'third-party', 'thirdparty', 'external', 'bower_components'}
+
+    GENERATED_MARKERS = (
+        b'@generated', b'DO NOT EDIT', b'Code generated by', b'code generated by', b'<auto-generated',
+        b'This file is automatically generated', b'This file was automatically generated',
+        b'Generated by the protocol buffer compiler',
+    )
+
+    COMMENT_PREFIXES = (b'#', b'//', b'/*', b'*', b'--', b';', b'%', b'<!--')
+
+    def __init__(
+        self,
+        head_bytes: int = 4096,
+        max_size_bytes: int = 1024 * 1024,
+        max_average_line_length: int = 300,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize the ContentClassifier.
+
+        Args:
+            head_bytes: How much of each file to sniff
+            max_size_bytes: Files larger than this are classified as oversized
+            max_average_line_length: Average line length above which a file counts as minified
+            max_workers: Number of threads used to sniff files in parallel
+        """
+        self.head_bytes = head_bytes
+        self.max_size_bytes = max_size_bytes
+        self.max_average_line_length = max_average_line_length
+        self.max_workers = max_workers
+        self._cache: Dict[Tuple[Path, Hashable], Optional[str]] = {}
+        self._cache_lock = threading.Lock()
+        self._loaded_mtimes: Dict[Tuple[Path, Path], int] = {}
+
+    def classify_all(self, source: FileSource, file_paths: List[Path]) -> Dict[int, str]:
+        """
+        Classify files, sniffing only the ones missing from the cache, in parallel.
+        Cache hits are resolved inline against the fingerprint each file was listed
+        with, so a warm start from a content pack neither checks nor reads the files.
+
+        Args:
+            source: Source the files are read from
+            file_paths: Files to classify
+
+        Returns:
+            Classification reason by index, for the files that should be hidden
+        """
+        keys = [self._listed_key(source, file_path) for file_path in file_paths]
+        with self._cache_lock:
+            reasons = {index: self._cache[key] for index, key in enumerate(keys) if key is not None and key in self._cache}
+        uncached = [(index, key) for index, key in enumerate(keys) if key is not None and index not in reasons]
+        if uncached:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                sniffed = executor.map(lambda item: self._classify_key(source, item[1]), uncached)
+                reasons.update(zip((index for index, _ in uncached), sniffed))
+        return {index: reason for index, reason in sorted(reasons.items()) if reason is not None}
+
+    def classify(self, source: FileSource, file_path: Path) -> Optional[str]:
+        """
+        Classify a single file, using the cached result while the file is unchanged.
+
+        Returns:
+            A reason such as "lockfile" or "generated", or None for regular source files
+        """
+        try:
+            key = (file_path, source.fingerprint(file_path))
+        except OSError:
+            return None
+        with self._cache_lock:
+            if key in self._cache:
+                return self._cache[key]
+        return self._classify_key(source, key)
+
+    @staticmethod
+    def _listed_key(source: FileSource, file_path: Path) -> Optional[Tuple[Path, Hashable]]:
+        try:
+            return file_path, source.listed_fingerprint(file_path)
+        except OSError:
+            return None
+
+    def _classify_key(self, source: FileSource, key: Tuple[Path, Hashable]) -> Optional[str]:
+        reason = self._classify_uncached(source, key[0])
+        with self._cache_lock:
+            self._cache[key] = reason
+        return reason
+
+    def save(self, cache_path: Path, source: FileSource, file_paths: List[Path]) -> None:
+        """
+        Atomically write the cached classification of the given files, for other processes to load.
+
+        Args:
+            cache_path: File to write
+            source: Source the files were classified from
+            file_paths: Files to include; ones that were never classified are left out
+        """
+        rows = []
+        for file_path in file_paths:
+            key = self._listed_key(source, file_path)
+            if key is None:
+                continue
+            with self._cache_lock:
+                if key not in self._cache:
+                    continue
+                reason = self._cache[key]
+            rows.append([file_path.relative_to(source.root_dir).as_posix(), key[1], reason])
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_text(json.dumps(rows), encoding='utf-8')
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save classifications to {cache_path}: {e}")
+            temp_path.unlink(missing_ok=True)
+
+    def load(self, cache_path: Path, root_dir: str) -> None:
+        """
+        Merge classifications saved by another process into the cache, unless they were already loaded.
+
+        Args:
+            cache_path: File written by save
+            root_dir: Root directory the caller's file paths are rooted at
+        """
+        root = Path(root_dir)
+        try:
+            mtime_ns = cache_path.stat().st_mtime_ns
+            if self._loaded_mtimes.get((cache_path, root)) == mtime_ns:
+                return
+            rows = json.loads(cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.debug(f"No usable classifications at {cache_path}: {e}")
+            return
+        with self._cache_lock:
+            for relative_path, fingerprint, reason in rows:
+                self._cache[(root / relative_path, fingerprint)] = reason
+            self._loaded_mtimes[(cache_path, root)] = mtime_ns
+
+    def _classify_uncached(self, source: FileSource, file_path: Path) -> Optional[str]:
+        reason = self._classify_path(file_path.relative_to(source.root_dir))
+        if reason is not None:
+            return reason
+        try:
+            if source.file_size(file_path) > self.max_size_bytes:
+                return "oversized"
+            if not source.cheap_heads:
+                return None
+            head = source.read_head(file_path, self.head_bytes)
+        except Exception as e:
+            logger.debug(f"Could not sniff {file_path}: {e}")
+            return None
+        return self._classify_content(head)
+
+    def _classify_path(self, relative_path: Path) -> Optional[str]:
+        name = relative_path.name
+        directories = set(relative_path.parts[:-1])
+        if name in self.LOCKFILE_NAMES or name.endswith('.lock'):
+            return "lockfile"
+        if name.endswith(self.GENERATED_SUFFIXES):
+            return "generated"
+        if name.endswith(self.MINIFIED_SUFFIXES):
+            return "minified"
+        if name.endswith(self.SNAPSHOT_SUFFIXES) or directories & self.SNAPSHOT_DIRS:
+            return "snapshot"
+        if directories & self.VENDOR_DIRS:
+            return "vendored"
+        return None
+
+    def _classify_content(self, head: bytes) -> Optional[str]:
+        if b'\0' in head:
+            return "binary"
+        if any(marker in line for line in self._leading_comment_lines(head) for marker in self.GENERATED_MARKERS):
+            return "generated"
+        lines = head.count(b'\n') + 1
+        if len(head) >= self.head_bytes // 2 and len(head) / lines > self.max_average_line_length:
+            return "minified"
+        return None
+
+    def _leading_comment_lines(self, head: bytes) -> List[bytes]:
+        """The comment lines a file starts with, where generators put their marker; string literals further down don't count."""
+        lines = []
+        for line in head.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if not stripped.startswith(self.COMMENT_PREFIXES):
+                break
+            lines.append(stripped)
+        return lines
+
+
+def classification_path_for(pack_path: Path) -> Path:
+    """Return where the classification of a content pack's files is saved next to it."""
+    return pack_path.with_suffix(".classes.json")
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Hashable, List, NamedTuple, Optional, Set
+
+from app.util.file_source import FileSource
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+PACK_MAGIC = b"CORPACK1"
+HEADER = struct.Struct("<8sQ")
+
+
+class PackFormatError(ValueError):
+    pass
+
+
+class PackEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    offset: int
+    length: int
+    compressed: bool
+
+
+class ContentPack:
+    """
+    A single file holding a file table and the contents of every file in it.
+
+    Layout: header (magic, index length), a JSON index of
+    [relative path, size, mtime_ns, offset, stored length, compressed] rows
+    and of the directory mtimes the file table was listed at, then the blobs. The pack is memory-mapped, so uncompressed blobs are
+    sliced straight out of the page cache.
+    """
+
+    def __init__(self, pack_path: Path):
+        self.pack_path = pack_path
+        self._file = open(pack_path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise PackFormatError(f"Empty pack file: {pack_path}") from e
+        self.root_dir, self.entries, self.directories, self._blob_start = self._read_index()
+
+    def _read_index(self) -> tuple[str, Dict[str, PackEntry], Dict[str, int], int]:
+        if len(self._mmap) < HEADER.size:
+            raise PackFormatError(f"Truncated pack file: {self.pack_path}")
+        magic, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC:
+            raise PackFormatError(f"Not a content pack: {self.pack_path}")
+        index = json.loads(self._mmap[HEADER.size:HEADER.size + index_length])
+        entries = {row[0]: PackEntry(row[1], row[2], row[3], row[4], bool(row[5])) for row in index["entries"]}
+        return index["root"], entries, index.get("dirs", {}), HEADER.size + index_length
+
+    def read_bytes(self, relative_path: str) -> memoryview | bytes:
+        """
+        Return the contents stored for a file.
+
+        Args:
+            relative_path: POSIX path relative to the pack root
+
+        Returns:
+            A zero-copy view for uncompressed blobs, decompressed bytes otherwise
+        """
+        entry = self.entries[relative_path]
+        start = self._blob_start + entry.offset
+        view = memoryview(self._mmap)[start:start + entry.length]
+        return zlib.decompress(view) if entry.compressed else view
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    @staticmethod
+    def write(pack_path: Path, source: FileSource, file_paths: List[Path], compress: bool = False) -> None:
+        """
+        Write the given files of a source into a pack, replacing any existing pack atomically.
+
+        Args:
+            pack_path: Where to write the pack
+            source: Source to read the file contents from
+            file_paths: Files to include, rooted at source.root_dir
+            compress: Whether to zlib-compress blobs that shrink when compressed
+
+        Raises:
+            OSError: If a file cannot be read; the existing pack is left untouched then
+        """
+        pack_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_name = f"{pack_path.name}.{os.getpid()}.{threading.get_ident()}"
+        temp_path = pack_path.with_name(f"{temp_name}.tmp")
+        blobs_path = pack_path.with_name(f"{temp_name}.blobs")
+        try:
+            with open(blobs_path, 'wb+') as blobs:
+                rows = ContentPack._write_blobs(blobs, source, file_paths, compress)
+                index = json.dumps({
+                    "root": str(source.root_dir.resolve()),
+                    "entries": rows,
+                    "dirs": source.directory_stamps(),
+                }).encode('utf-8')
+                blobs.seek(0)
+                with open(temp_path, 'wb') as pack:
+                    pack.write(HEADER.pack(PACK_MAGIC, len(index)))
+                    pack.write(index)
+                    while chunk := blobs.read(1024 * 1024):
+                        pack.write(chunk)
+            os.replace(temp_path, pack_path)
+            logger.info(f"Wrote content pack with {len(rows)} files to {pack_path}")
+        finally:
+            for leftover in (temp_path, blobs_path):
+                if leftover.exists():
+                    leftover.unlink()
+
+    @staticmethod
+    def _write_blobs(blobs: BinaryIO, source: FileSource, file_paths: List[Path], compress: bool) -> list:
+        rows = []
+        offset = 0
+        for file_path in file_paths:
+            # Raw bytes keep undecodable files in the table; a missing one would shift every later index
+            stat = file_path.stat()
+            data = source.read_bytes(file_path)
+            compressed = False
+            if compress:
+                packed = zlib.compress(data, 1)
+                if len(packed) < len(data):
+                    data, compressed = packed, True
+            blobs.write(data)
+            relative_path = file_path.relative_to(source.root_dir).as_posix()
+            rows.append([relative_path, stat.st_size, stat.st_mtime_ns, offset, len(data), int(compressed)])
+            offset += len(data)
+        return rows
+
+
+class PackedSource(FileSource):
+    """
+    Serves the file table and contents from a ContentPack. The file table is
+    used while none of the directories it was listed from changed, otherwise
+    the fallback source lists the files again. Each file is checked against
+    the filesystem the first time it is used; files that changed since the
+    pack was written are served by the fallback source instead.
+    """
+
+    def __init__(self, root_dir: str, pack: ContentPack, fallback: FileSource, charset: str = "utf-8"):
+        super().__init__(root_dir)
+        self.pack = pack
+        self.fallback = fallback
+        self.charset = charset
+        self._validated: Set[str] = set()
+        self._stale: Set[str] = set()
+        self.table_changed = False
+
+    def list_files(self) -> List[Path]:
+        if self._directories_unchanged():
+            return [self.root_dir / relative_path for relative_path in self.pack.entries]
+        logger.info(f"Files were added or removed since {self.pack.pack_path} was written, listing them again")
+        self.table_changed = True
+        return self.fallback.list_files()
+
+    def _directories_unchanged(self) -> bool:
+        if not self.pack.directories:
+            return False
+        for relative_path, mtime_ns in self.pack.directories.items():
+            try:
+                if (self.root_dir / relative_path).stat().st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _relative_path(self, file_path: Path) -> str:
+        return file_path.relative_to(self.root_dir).as_posix()
+
+    def _is_fresh(self, relative_path: str) -> bool:
+        if relative_path in self._validated:
+            return True
+        if relative_path in self._stale:
+            return False
+        entry = self.pack.entries[relative_path]
+        try:
+            stat = (self.root_dir / relative_path).stat()
+            fresh = stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns
+        except OSError:
+            fresh = False
+        (self._validated if fresh else self._stale).add(relative_path)
+        return fresh
+
+    def is_unchanged(self, file_paths: List[Path]) -> bool:
+        """Check that the pack holds exactly these files and none of them changed on disk."""
+        relative_paths = [self._relative_path(file_path) for file_path in file_paths]
+        if relative_paths != list(self.pack.entries):
+            return False
+        return all(self._is_fresh(relative_path) for relative_path in relative_paths)
+
+    @property
+    def outdated(self) -> bool:
+        """Whether the file table or any file checked so far differs from the pack."""
+        return self.table_changed or bool(self._stale)
+
+    def read_text(self, file_path: Path) -> str:
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and self._is_fresh(relative_path):
+            return str(self.pack.read_bytes(relative_path), self.charset)
+        return self.fallback.read_text(file_path)
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and self._is_fresh(relative_path):
+            return bytes(self.pack.read_bytes(relative_path))
+        return self.fallback.read_bytes(file_path)
+
+    def file_size(self, file_path: Path) -> int:
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and self._is_fresh(relative_path):
+            return self.pack.entries[relative_path].size
+        return self.fallback.file_size(file_path)
+
+    def fingerprint(self, file_path: Path) -> Hashable:
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and self._is_fresh(relative_path):
+            return self.pack.entries[relative_path].mtime_ns
+        return self.fallback.fingerprint(file_path)
+
+    def listed_fingerprint(self, file_path: Path) -> Hashable:
+        # The pack's record, unless the file was already found to have changed
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and relative_path not in self._stale:
+            return self.pack.entries[relative_path].mtime_ns
+        return self.fallback.fingerprint(file_path)
+
+    def read_head(self, file_path: Path, size: int) -> bytes:
+        relative_path = self._relative_path(file_path)
+        if relative_path in self.pack.entries and self._is_fresh(relative_path):
+            return bytes(self.pack.read_bytes(relative_path)[:size])
+        return self.fallback.read_head(file_path, size)
+
+    def directory_stamps(self) -> Dict[str, int]:
+        # Fresh stamps if the fallback listed the files, else the table is still the pack's
+        return self.fallback.directory_stamps() or dict(self.pack.directories)
+
+    def close(self) -> None:
+        self.pack.close()
+        self.fallback.close()
+
+
+def pack_path_for(pack_dir: str, base_path: str) -> Path:
+    """Return the pack location used for a codebase inside pack_dir."""
+    root = str(Path(base_path).resolve())
+    return Path(pack_dir).expanduser() / f"{hashlib.sha1(root.encode('utf-8')).hexdigest()}.pack"
+
+
+def open_pack(pack_path: Path, base_path: str) -> Optional[ContentPack]:
+    """
+    Open a pack if it exists and was written for base_path.
+
+    Returns:
+        The opened pack, or None if there is no usable pack
+    """
+    if not pack_path.exists():
+        return None
+    try:
+        pack = ContentPack(pack_path)
+    except (OSError, PackFormatError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable content pack {pack_path}: {e}")
+        return None
+    if pack.root_dir != str(Path(base_path).resolve()):
+        logger.warning(f"Content pack {pack_path} belongs to {pack.root_dir}, ignoring it")
+        pack.close()
+        return None
+    return pack
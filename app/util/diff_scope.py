@@ -0,0 +1,155 @@
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.util.file_source import FileSource
+from app.util.git_source import GitError, is_listed, run_git
+from app.util.import_graph import ImportResolver
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+WORKING_TREE = "working-tree"
+
+INDEX_FILE_STEMS = {'__init__', 'index', 'mod', 'main'}
+
+FILE_DIFF_START = re.compile(r'^(?=diff --git )', re.MULTILINE)
+
+# Parsed output must not depend on the user's color, prefix or external diff settings
+PLAIN_DIFF_ARGS = ["--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/"]
+
+
+class DiffScope:
+    """
+    Restricts a codebase to the files touched by a change and their direct
+    import neighbors, for questions asked while reviewing that change.
+    """
+
+    def __init__(self, base_path: str, git_range: str = WORKING_TREE, hunks_only: bool = False):
+        """
+        Initialize the DiffScope.
+
+        Args:
+            base_path: Root directory of the codebase, inside a git repository
+            git_range: A git range such as "main...feature", or "working-tree" for uncommitted changes
+            hunks_only: Hand the agent the diff hunks of changed files instead of their full contents
+        """
+        self.base_path = Path(base_path)
+        self.git_range = git_range
+        self.hunks_only = hunks_only
+        self.changed: Set[str] = set(self._changed_paths())
+        self._hunks: Dict[str, str] = self._load_hunks() if hunks_only else {}
+        logger.info(f"DiffScope {git_range} has {len(self.changed)} changed files")
+
+    def _diff_args(self) -> List[str]:
+        return ["HEAD"] if self.git_range == WORKING_TREE else [self.git_range]
+
+    def _changed_paths(self) -> List[str]:
+        output = run_git(self.base_path, "diff", *PLAIN_DIFF_ARGS, "--name-only", "--relative", "--diff-filter=d", "-z", *self._diff_args())
+        paths = [path for path in output.decode('utf-8', 'surrogateescape').split("\0") if path]
+        if self.git_range == WORKING_TREE:
+            untracked = run_git(self.base_path, "ls-files", "--others", "--exclude-standard", "-z")
+            paths.extend(path for path in untracked.decode('utf-8', 'surrogateescape').split("\0") if path)
+        return paths
+
+    def list_files(self, source: FileSource, revision: str | None = None) -> List[Path]:
+        """
+        List the files in scope without walking the tree: the file table comes from git,
+        and only the changed files and the few files that mention them are read.
+
+        Args:
+            source: Source the files are read from
+            revision: Revision the source reads, if not the working tree
+
+        Returns:
+            The files in scope
+        """
+        if revision:
+            # GitSource lists from the tree object, which is as cheap as ls-files
+            return self.restrict(source, source.list_files(), revision)
+        output = run_git(self.base_path, "ls-files", "--cached", "--others", "--exclude-standard", "-z")
+        relative_paths = [path for path in output.decode('utf-8', 'surrogateescape').split("\0") if path and is_listed(path)]
+        in_scope = self.restrict(source, [source.root_dir / path for path in relative_paths])
+        # ls-files still lists tracked files that were deleted without staging
+        return [file_path for file_path in in_scope if file_path.is_file()]
+
+    def restrict(self, source: FileSource, file_paths: List[Path], revision: str | None = None) -> List[Path]:
+        """
+        Keep only the changed files and the files they import or are imported by.
+
+        Args:
+            source: Source the files are read from
+            file_paths: All files of the codebase
+            revision: Revision the source reads, if not the working tree
+
+        Returns:
+            The files in scope, in their original order
+        """
+        relative_paths = [file_path.relative_to(source.root_dir).as_posix() for file_path in file_paths]
+        resolver = ImportResolver(relative_paths)
+        changed_indices = {resolver.index_by_path[path] for path in self.changed if path in resolver.index_by_path}
+        in_scope = set(changed_indices)
+        for index in changed_indices:
+            in_scope.update(self._imports_of(resolver, source, file_paths[index], relative_paths[index]))
+        for relative_path in self._importer_candidates(relative_paths, changed_indices, revision):
+            candidate = resolver.index_by_path.get(relative_path)
+            if candidate is None or candidate in in_scope:
+                continue
+            if changed_indices & set(self._imports_of(resolver, source, file_paths[candidate], relative_path)):
+                in_scope.add(candidate)
+        return [file_path for index, file_path in enumerate(file_paths) if index in in_scope]
+
+    @staticmethod
+    def _imports_of(resolver: ImportResolver, source: FileSource, file_path: Path, relative_path: str) -> List[int]:
+        try:
+            return resolver.resolve(relative_path, source.read_text(file_path))
+        except Exception as e:
+            logger.debug(f"Could not read imports of {relative_path}: {e}")
+            return []
+
+    def _importer_candidates(self, relative_paths: List[str], changed_indices: Set[int], revision: str | None) -> List[str]:
+        """Use git grep to find the few files that mention a changed module's name, so only those are parsed."""
+        names = {self._module_stem(relative_paths[index]) for index in changed_indices}
+        if not names:
+            return []
+        patterns = [arg for name in sorted(names) for arg in ("-e", name)]
+        location = [revision, "--", "."] if revision else ["--untracked"]
+        try:
+            output = run_git(self.base_path, "grep", "--no-color", "-l", "-F", "-z", *patterns, *location)
+        except GitError as e:
+            # git grep exits with an error when nothing matches
+            logger.debug(f"git grep found no importers: {e}")
+            return []
+        matches = [path for path in output.decode('utf-8', 'surrogateescape').split("\0") if path]
+        prefix = f"{revision}:" if revision else ""
+        return [path[len(prefix):] if path.startswith(prefix) else path for path in matches]
+
+    @staticmethod
+    def _module_stem(relative_path: str) -> str:
+        stem = posixpath.splitext(posixpath.basename(relative_path))[0]
+        if stem in INDEX_FILE_STEMS or relative_path.endswith('.go'):
+            return posixpath.basename(posixpath.dirname(relative_path)) or stem
+        return stem
+
+    def get_hunks(self, relative_path: str) -> Optional[str]:
+        """
+        Get the diff of a changed file.
+
+        Args:
+            relative_path: POSIX path relative to the base path
+
+        Returns:
+            The file's diff, or None if the file has none (unchanged or untracked) or hunks_only is off
+        """
+        return self._hunks.get(relative_path)
+
+    def _load_hunks(self) -> Dict[str, str]:
+        output = run_git(self.base_path, "diff", *PLAIN_DIFF_ARGS, "--relative", "--diff-filter=d", *self._diff_args())
+        hunks: Dict[str, str] = {}
+        for file_diff in FILE_DIFF_START.split(output.decode('utf-8', 'replace')):
+            for line in file_diff.splitlines():
+                if line.startswith("+++ b/"):
+                    hunks[line[len("+++ b/"):]] = file_diff
+                    break
+        return hunks
@@ -56,6 +56,7 @@ class FileAcceptor:
         
         # Find and load gitignore
         gitignore_path = self._find_gitignore(self.root_dir)
+        self.gitignore_path = gitignore_path
         if gitignore_path:
             logger.info(f"Found .gitignore at: {gitignore_path}")
             self._load_gitignore(gitignore_path)
@@ -0,0 +1,109 @@
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Hashable, List
+
+from app.util.file_traverser import FileTraverser
+
+
+class FileSource(ABC):
+    """
+    Where CodeReader gets its file table and file contents from.
+    Paths are always rooted at root_dir, even when no such file exists on disk.
+    """
+
+    # Whether read_head is much cheaper than reading the whole file; files are classified by path and size otherwise
+    cheap_heads = True
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir)
+
+    @abstractmethod
+    def list_files(self) -> List[Path]:
+        """Return the files that make up the codebase."""
+        pass
+
+    @abstractmethod
+    def read_text(self, file_path: Path) -> str:
+        """Return the decoded contents of a file."""
+        pass
+
+    @abstractmethod
+    def read_bytes(self, file_path: Path) -> bytes:
+        """Return the raw contents of a file."""
+        pass
+
+    @abstractmethod
+    def file_size(self, file_path: Path) -> int:
+        """Return the size of a file in bytes."""
+        pass
+
+    @abstractmethod
+    def fingerprint(self, file_path: Path) -> Hashable:
+        """Return a value that changes whenever the file contents change."""
+        pass
+
+    def listed_fingerprint(self, file_path: Path) -> Hashable:
+        """
+        Return the fingerprint the file had when it was listed, without checking it
+        again where the source can tell; for caches consulted for every listed file.
+        """
+        return self.fingerprint(file_path)
+
+    def read_head(self, file_path: Path, size: int) -> bytes:
+        """Return up to size bytes from the start of a file."""
+        return self.read_bytes(file_path)[:size]
+
+    def directory_stamps(self) -> Dict[str, int]:
+        """
+        Return the mtimes of the directories and ignore files the last list_files
+        depended on, keyed by path relative to root_dir. While none of them changes,
+        no file was added, removed or renamed. Empty if the source cannot tell.
+        """
+        return {}
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+        pass
+
+
+class WorkingTreeSource(FileSource):
+    """Reads the files currently checked out on disk."""
+
+    def __init__(self, root_dir: str, charset: str = "utf-8"):
+        super().__init__(root_dir)
+        self.charset = charset
+        self._directory_stamps: Dict[str, int] = {}
+
+    def list_files(self) -> List[Path]:
+        traverser = FileTraverser(str(self.root_dir), charset=self.charset)
+        file_paths = list(traverser)
+        watched = list(traverser.directories)
+        if traverser.acceptor.gitignore_path is not None:
+            watched.append(traverser.acceptor.gitignore_path)
+        self._directory_stamps = {}
+        for path in watched:
+            try:
+                self._directory_stamps[os.path.relpath(path, self.root_dir)] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+        return file_paths
+
+    def directory_stamps(self) -> Dict[str, int]:
+        return dict(self._directory_stamps)
+
+    def read_text(self, file_path: Path) -> str:
+        return file_path.read_text(encoding=self.charset)
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        return file_path.read_bytes()
+
+    def file_size(self, file_path: Path) -> int:
+        return file_path.stat().st_size
+
+    def fingerprint(self, file_path: Path) -> Hashable:
+        return file_path.stat().st_mtime_ns
+
+    def read_head(self, file_path: Path, size: int) -> bytes:
+        with open(file_path, 'rb') as f:
+            return f.read(size)
@@ -1,5 +1,5 @@
 import os
-from typing import Iterator, Optional
+from typing import Iterator, List, Optional
 from pathlib import Path
 
 from app.util.file_acceptor import FileAcceptor
@@ -26,6 +26,7 @@ class FileTraverser:
         self.root_dir = Path(root_dir)
         self.charset = charset
         self.acceptor = acceptor if acceptor is not None else FileAcceptor(root_dir)
+        self.directories: List[Path] = []
 
     def _read_file_content(self, file_path: Path) -> Optional[str]:
         """Read file content with specified charset."""
@@ -38,7 +39,9 @@ class FileTraverser:
 
     def __iter__(self) -> Iterator[Path]:
         """Iterate over files based on acceptor rules."""
+        self.directories = []
         for root, dirs, files in os.walk(self.root_dir):
+            self.directories.append(Path(root))
             # Remove directories that shouldn't be traversed
             if self.acceptor:
                 dirs[:] = [d for d in dirs if self.acceptor.accept_directory(Path(root) / d)]
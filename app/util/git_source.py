@@ -0,0 +1,151 @@
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.util.file_acceptor import FileAcceptor
+from app.util.file_source import FileSource
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Submodules (commit) and symlinks have no readable blob content
+SKIPPED_MODES = {'160000', '120000'}
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def run_git(cwd: Path, *args: str) -> bytes:
+    """
+    Run a git command and return its stdout.
+
+    Args:
+        cwd: Directory to run git in
+        *args: Arguments passed to git
+
+    Returns:
+        The raw stdout of the command
+    """
+    try:
+        completed = subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise GitError("git executable not found") from e
+    except subprocess.CalledProcessError as e:
+        raise GitError(f"git {' '.join(args)} failed: {e.stderr.decode('utf-8', 'replace').strip()}") from e
+    return completed.stdout
+
+
+def is_listed(relative_path: str) -> bool:
+    """Apply the traversal's binary and ignored directory rules to a path git reports."""
+    path = Path(relative_path)
+    if path.suffix.lower() in FileAcceptor.BINARY_EXTENSIONS:
+        return False
+    return not any(part in FileAcceptor.IGNORED_DIRS for part in path.parts[:-1])
+
+
+class GitCatFile:
+    """
+    A long-lived `git cat-file --batch` process that serves object contents
+    without spawning a process or opening a file per read.
+    """
+
+    def __init__(self, repo_dir: Path):
+        self.repo_dir = repo_dir
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._process
+
+    def read(self, object_name: str) -> bytes:
+        """
+        Read an object's contents.
+
+        Args:
+            object_name: Object id or any revision expression git understands
+
+        Returns:
+            The raw object contents
+        """
+        with self._lock:
+            process = self._ensure_process()
+            assert process.stdin is not None and process.stdout is not None
+            process.stdin.write(object_name.encode('utf-8') + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().decode('utf-8').split()
+            if len(header) != 3:
+                raise GitError(f"Object not found: {object_name}")
+            size = int(header[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)  # trailing newline
+            return content
+
+    def close(self) -> None:
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                assert self._process.stdin is not None
+                self._process.stdin.close()
+                self._process.wait()
+            self._process = None
+
+
+class GitSource(FileSource):
+    """
+    Reads the files of a git revision straight from the object database,
+    without checking it out. Only tracked files are listed, so gitignore
+    rules are applied exactly as git applies them.
+    """
+
+    # cat-file --batch always sends the whole blob
+    cheap_heads = False
+
+    def __init__(self, root_dir: str, revision: str, charset: str = "utf-8"):
+        super().__init__(root_dir)
+        self.charset = charset
+        self.revision = revision
+        self.commit = run_git(self.root_dir, "rev-parse", "--verify", f"{revision}^{{commit}}").decode().strip()
+        self._blobs: Dict[Path, Tuple[str, int]] = {}
+        self._cat_file = GitCatFile(self.root_dir)
+        logger.info(f"GitSource initialized for {self.root_dir} at {revision} ({self.commit})")
+
+    def list_files(self) -> List[Path]:
+        # Run from root_dir so that the listing is scoped and relative to it
+        output = run_git(self.root_dir, "ls-tree", "-r", "-l", "-z", self.commit)
+        self._blobs = {}
+        for entry in output.split(b"\0"):
+            if not entry:
+                continue
+            meta, _, name = entry.decode('utf-8', 'surrogateescape').partition("\t")
+            mode, object_type, object_id, size = meta.split()
+            if object_type != "blob" or mode in SKIPPED_MODES:
+                continue
+            if not is_listed(name):
+                continue
+            self._blobs[self.root_dir / name] = (object_id, int(size))
+        return list(self._blobs)
+
+    def read_text(self, file_path: Path) -> str:
+        return self.read_bytes(file_path).decode(self.charset)
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        object_id, _ = self._blobs[file_path]
+        return self._cat_file.read(object_id)
+
+    def file_size(self, file_path: Path) -> int:
+        return self._blobs[file_path][1]
+
+    def fingerprint(self, file_path: Path) -> Hashable:
+        return self._blobs[file_path][0]
+
+    def close(self) -> None:
+        self._cat_file.close()
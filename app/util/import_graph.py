@@ -0,0 +1,339 @@
+import ast
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+PYTHON_IMPORT_PATTERN = re.compile(r'^\s*(?:from\s+(\.*[\w.]*)\s+import\s+\(?([\w, ]+)|import\s+([\w., ]+))', re.MULTILINE)
+JS_IMPORT_PATTERN = re.compile(r'''(?:from\s+|require\(\s*|import\s*\(\s*|import\s+)['"]([^'"]+)['"]''')
+GO_IMPORT_BLOCK_PATTERN = re.compile(r'^import\s*\((.*?)\)', re.MULTILINE | re.DOTALL)
+GO_IMPORT_PATTERN = re.compile(r'^import\s+(?:\w+\s+)?"([^"]+)"', re.MULTILINE)
+GO_QUOTED_PATTERN = re.compile(r'"([^"]+)"')
+JAVA_IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:static\s+)?([\w.]+?)(?:\.\*)?\s*;', re.MULTILINE)
+
+PYTHON_SOURCE_ROOTS = ('src', 'lib', 'python')
+JS_SUFFIXES = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.vue', '.svelte')
+JS_EXTENSIONS = ['', '.ts', '.tsx', '.js', '.jsx', '.mjs', '/index.ts', '/index.tsx', '/index.js']
+JAVA_SUFFIXES = ('.java', '.kt', '.scala')
+IMPORT_SUFFIXES = ('.py', '.go') + JS_SUFFIXES + JAVA_SUFFIXES
+MAX_JAVA_PACKAGE_DEPTH = 8
+
+
+class ImportResolver:
+    """
+    Maps the import statements of a file to the indices of the files they refer to.
+    Python imports are read with ast; JS/TS, Go and Java/Kotlin imports with regexes.
+    """
+
+    def __init__(self, relative_paths: List[str]):
+        """
+        Initialize the ImportResolver.
+
+        Args:
+            relative_paths: POSIX paths relative to the codebase root, in index order
+        """
+        self.index_by_path: Dict[str, int] = {}
+        self._index_by_module: Dict[str, int] = {}
+        self._index_by_java_name: Dict[str, int] = {}
+        self._go_files_by_dir: Dict[str, List[int]] = {}
+        for index, relative_path in enumerate(relative_paths):
+            self._register(index, relative_path)
+
+    def _register(self, index: int, relative_path: str) -> None:
+        self.index_by_path[relative_path] = index
+        if relative_path.endswith('.py'):
+            module = module_name(relative_path)
+            self._index_by_module[module] = index
+            root, _, rest = module.partition('.')
+            if root in PYTHON_SOURCE_ROOTS and rest:
+                self._index_by_module.setdefault(rest, index)
+        elif relative_path.endswith('.go'):
+            self._go_files_by_dir.setdefault(posixpath.dirname(relative_path), []).append(index)
+        elif relative_path.endswith(JAVA_SUFFIXES):
+            parts = posixpath.splitext(relative_path)[0].split('/')
+            for depth in range(2, min(len(parts), MAX_JAVA_PACKAGE_DEPTH) + 1):
+                self._index_by_java_name.setdefault('.'.join(parts[-depth:]), index)
+
+    def resolve(self, relative_path: str, content: str) -> List[int]:
+        """
+        Find the files imported by a file.
+
+        Args:
+            relative_path: POSIX path of the importing file
+            content: Contents of the importing file
+
+        Returns:
+            Indices of the imported files that exist in the codebase
+        """
+        return self.resolve_references(relative_path, parse_imports(relative_path, content))
+
+    def resolve_references(self, relative_path: str, references: List[str]) -> List[int]:
+        """
+        Find the files that the import references of a file point to.
+
+        Args:
+            relative_path: POSIX path of the importing file
+            references: The file's imports, as returned by parse_imports
+
+        Returns:
+            Indices of the imported files that exist in the codebase
+        """
+        if relative_path.endswith('.py'):
+            indices = [self._index_by_module.get(module) for module in references]
+        elif relative_path.endswith(JS_SUFFIXES):
+            indices = [self._js_file(target) for target in references]
+        elif relative_path.endswith('.go'):
+            indices = [index for import_path in references for index in self._go_files(import_path)]
+        elif relative_path.endswith(JAVA_SUFFIXES):
+            indices = [self._index_by_java_name.get(name) for name in references]
+        else:
+            return []
+        own_index = self.index_by_path.get(relative_path)
+        return [i for i in dict.fromkeys(indices) if i is not None and i != own_index]
+
+    def _js_file(self, target: str) -> Optional[int]:
+        for extension in JS_EXTENSIONS:
+            index = self.index_by_path.get(target + extension)
+            if index is not None:
+                return index
+        return None
+
+    def _go_files(self, import_path: str) -> List[int]:
+        parts = import_path.split('/')
+        # Module paths carry a host and repository prefix; match the longest suffix present in the tree
+        for start in range(len(parts)):
+            files = self._go_files_by_dir.get('/'.join(parts[start:]))
+            if files:
+                return files
+        return []
+
+
+class ImportCache:
+    """
+    The parsed imports of each file, keyed by path and fingerprint so that only
+    files that changed are parsed again. Persisted as JSON when given a path.
+    """
+
+    _instances: Dict[Path, "ImportCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        """
+        Initialize the ImportCache.
+
+        Args:
+            cache_path: File to load the cache from and save it to; in memory only if None
+        """
+        self.cache_path = cache_path
+        self._entries: Dict[Tuple[str, Hashable], List[str]] = {}
+        self._loaded_mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_repository(cls, cache_dir: str, base_path: str) -> "ImportCache":
+        """Return the process-wide cache of a repository, persisted under cache_dir."""
+        return cls.shared(import_cache_path_for(cache_dir, base_path))
+
+    @classmethod
+    def shared(cls, cache_path: Path) -> "ImportCache":
+        """Return the process-wide cache persisted at cache_path."""
+        with cls._instances_lock:
+            if cache_path not in cls._instances:
+                cls._instances[cache_path] = cls(cache_path)
+            return cls._instances[cache_path]
+
+    def get(self, relative_path: str, fingerprint: Hashable) -> Optional[List[str]]:
+        with self._lock:
+            return self._entries.get((relative_path, fingerprint))
+
+    def put(self, relative_path: str, fingerprint: Hashable, references: List[str]) -> None:
+        with self._lock:
+            self._entries[(relative_path, fingerprint)] = references
+
+    def load(self) -> None:
+        """Merge in the entries saved on disk, if the file changed since it was last loaded."""
+        if self.cache_path is None:
+            return
+        try:
+            mtime_ns = self.cache_path.stat().st_mtime_ns
+            if mtime_ns == self._loaded_mtime_ns:
+                return
+            rows = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.debug(f"No usable import cache at {self.cache_path}: {e}")
+            return
+        with self._lock:
+            for relative_path, fingerprint, references in rows:
+                self._entries.setdefault((relative_path, fingerprint), references)
+            self._loaded_mtime_ns = mtime_ns
+
+    def save(self) -> None:
+        """Atomically write the latest entry of every file to disk."""
+        if self.cache_path is None:
+            return
+        with self._lock:
+            latest = {relative_path: (fingerprint, references) for (relative_path, fingerprint), references in self._entries.items()}
+        rows = [[relative_path, fingerprint, references] for relative_path, (fingerprint, references) in latest.items()]
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_text(json.dumps(rows), encoding='utf-8')
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save import cache {self.cache_path}: {e}")
+            temp_path.unlink(missing_ok=True)
+
+
+def import_cache_path_for(cache_dir: str, base_path: str) -> Path:
+    """Return the import cache location used for a codebase inside cache_dir."""
+    root = str(Path(base_path).resolve())
+    return Path(cache_dir).expanduser() / f"{hashlib.sha1(root.encode('utf-8')).hexdigest()}.imports.json"
+
+
+def has_imports(relative_path: str) -> bool:
+    """Whether parse_imports understands the file's language."""
+    return relative_path.endswith(IMPORT_SUFFIXES)
+
+
+def parse_imports(relative_path: str, content: str) -> List[str]:
+    """
+    Extract the imports of a file. The result depends only on the file itself,
+    not on which other files exist, so it can be cached per file version.
+
+    Args:
+        relative_path: POSIX path of the file
+        content: Contents of the file
+
+    Returns:
+        Dotted modules for Python, normalized relative targets without extension for
+        JS/TS, import paths for Go and qualified names for Java/Kotlin
+    """
+    if relative_path.endswith('.py'):
+        package = module_name(relative_path)
+        if not relative_path.endswith('__init__.py'):
+            package = package.rpartition('.')[0]
+        return _python_imported_modules(package, content)
+    if relative_path.endswith(JS_SUFFIXES):
+        directory = posixpath.dirname(relative_path)
+        return [posixpath.normpath(posixpath.join(directory, specifier)) for specifier in JS_IMPORT_PATTERN.findall(content) if specifier.startswith('.')]
+    if relative_path.endswith('.go'):
+        import_paths = GO_IMPORT_PATTERN.findall(content)
+        for block in GO_IMPORT_BLOCK_PATTERN.findall(content):
+            import_paths.extend(GO_QUOTED_PATTERN.findall(block))
+        return import_paths
+    if relative_path.endswith(JAVA_SUFFIXES):
+        return JAVA_IMPORT_PATTERN.findall(content)
+    return []
+
+
+def _python_imported_modules(package: str, content: str) -> List[str]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return _python_imported_modules_by_regex(package, content)
+    modules: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = resolve_relative_module(package, '.' * node.level + (node.module or ''))
+            modules.append(base)
+            modules.extend(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+    return modules
+
+
+def _python_imported_modules_by_regex(package: str, content: str) -> List[str]:
+    modules: List[str] = []
+    for from_module, names, plain_imports in PYTHON_IMPORT_PATTERN.findall(content):
+        if plain_imports:
+            modules.extend(m.split(' as ')[0].strip() for m in plain_imports.split(','))
+        else:
+            base = resolve_relative_module(package, from_module)
+            modules.append(base)
+            modules.extend(f"{base}.{n.split(' as ')[0].strip()}" for n in names.split(',') if n.strip())
+    return modules
+
+
+def module_name(relative_path: str) -> str:
+    """Return the dotted Python module name of a file path."""
+    module = relative_path[:-len('.py')].replace('/', '.')
+    if module.endswith('.__init__'):
+        module = module[:-len('.__init__')]
+    return module
+
+
+def resolve_relative_module(package: str, module: str) -> str:
+    """Resolve a possibly relative module name against the importing package."""
+    level = len(module) - len(module.lstrip('.'))
+    if level == 0:
+        return module
+    parts = package.split('.') if package else []
+    parts = parts[:len(parts) - (level - 1)]
+    remainder = module[level:]
+    return '.'.join(parts + ([remainder] if remainder else []))
+
+
+def build_import_edges(resolver: ImportResolver, files: Iterable[Tuple[int, str, List[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the import graph as edge arrays.
+
+    Args:
+        resolver: Resolver for the codebase
+        files: (index, relative path, import references) of each file
+
+    Returns:
+        Arrays of importing and imported file indices, one entry per edge
+    """
+    sources: List[int] = []
+    targets: List[int] = []
+    for index, relative_path, references in files:
+        for target in resolver.resolve_references(relative_path, references):
+            sources.append(index)
+            targets.append(target)
+    return np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+
+def pagerank(
+    node_count: int,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    damping: float = 0.85,
+    max_iterations: int = 100,
+    tolerance: float = 1e-8,
+) -> np.ndarray:
+    """
+    Compute PageRank over a sparse edge list, so files that are imported by
+    many (central) files score highest.
+
+    Args:
+        node_count: Number of nodes in the graph
+        sources: Edge start nodes
+        targets: Edge end nodes
+
+    Returns:
+        A score per node, summing to 1
+    """
+    if node_count == 0:
+        return np.zeros(0)
+    out_degree = np.bincount(sources, minlength=node_count).astype(np.float64)
+    edge_weights = 1.0 / out_degree[sources]
+    dangling = out_degree == 0
+    rank = np.full(node_count, 1.0 / node_count)
+    for _ in range(max_iterations):
+        incoming = np.bincount(targets, weights=rank[sources] * edge_weights, minlength=node_count)
+        updated = (1.0 - damping) / node_count + damping * (incoming + rank[dangling].sum() / node_count)
+        converged = np.abs(updated - rank).sum() < tolerance
+        rank = updated
+        if converged:
+            break
+    return rank
@@ -0,0 +1,254 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.util.content_classifier import ContentClassifier, classification_path_for
+from app.util.content_pack import ContentPack, PackedSource, open_pack, pack_path_for
+from app.util.file_source import FileSource, WorkingTreeSource
+from app.util.import_graph import ImportCache, has_imports, import_cache_path_for, parse_imports
+from app.util.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_PARSE_BYTES = 512 * 1024
+
+
+class DaemonAlreadyRunning(RuntimeError):
+    pass
+
+
+class RepoIndex:
+    """
+    The daemon's index of one repository: a content pack that is kept in sync
+    with the working tree and memory-mapped by every client, along with the
+    classification and parsed imports of its files.
+    """
+
+    def __init__(self, base_path: str, pack_path: Path, import_cache_path: Path, classifier: ContentClassifier, refresh_seconds: float):
+        self.base_path = base_path
+        self.pack_path = pack_path
+        self.classification_path = classification_path_for(pack_path)
+        self.import_cache = ImportCache(import_cache_path)
+        self.classifier = classifier
+        self.refresh_seconds = refresh_seconds
+        self._refreshed_at: Optional[float] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def describe(self) -> Dict[str, Any]:
+        """Return where clients find the index; the pack is None until the first refresh wrote it."""
+        return {
+            "pack_path": str(self.pack_path) if self.pack_path.exists() else None,
+            "import_cache_path": str(self.import_cache.cache_path),
+        }
+
+    def request_refresh(self) -> None:
+        """Start a background refresh unless one is running or the last one was very recent."""
+        with self._lock:
+            if self._refreshing:
+                return
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self._refresh()
+        except Exception as e:
+            logger.error(f"Refreshing the index of {self.base_path} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._refreshed_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        working_tree = WorkingTreeSource(self.base_path)
+        pack = open_pack(self.pack_path, self.base_path)
+        # The pack's directory stamps spare the walk when no file was added or removed
+        source: FileSource = PackedSource(self.base_path, pack, working_tree) if pack is not None else working_tree
+        try:
+            file_paths = source.list_files()
+            # Unchanged files are copied over from the previous pack instead of being read from disk again
+            if not isinstance(source, PackedSource) or not source.is_unchanged(file_paths):
+                ContentPack.write(self.pack_path, source, file_paths)
+            demoted = self.classifier.classify_all(source, file_paths)
+            self.classifier.save(self.classification_path, source, file_paths)
+            self._update_imports(source, [file_path for index, file_path in enumerate(file_paths) if index not in demoted])
+        finally:
+            source.close()
+
+    def _update_imports(self, source: FileSource, file_paths: List[Path]) -> None:
+        self.import_cache.load()
+        parsed = 0
+        for file_path in file_paths:
+            relative_path = file_path.relative_to(source.root_dir).as_posix()
+            if not has_imports(relative_path):
+                continue
+            try:
+                fingerprint = source.fingerprint(file_path)
+                if self.import_cache.get(relative_path, fingerprint) is not None or source.file_size(file_path) > MAX_PARSE_BYTES:
+                    continue
+                self.import_cache.put(relative_path, fingerprint, parse_imports(relative_path, source.read_text(file_path)))
+                parsed += 1
+            except Exception as e:
+                logger.debug(f"Could not parse imports of {relative_path}: {e}")
+        if parsed:
+            self.import_cache.save()
+            logger.info(f"Parsed imports of {parsed} changed files in {self.base_path}")
+
+
+class IndexDaemon:
+    """
+    Local indexer shared by all MCP server processes on a machine. It owns
+    traversal, content packs, classification and import parsing for each
+    repository, refreshes them in the background and hands out their paths
+    over a Unix domain socket; clients memory-map the packs, so the contents
+    are held once in the page cache no matter how many clients there are.
+    """
+
+    def __init__(self, socket_path: str, pack_dir: str, import_cache_dir: str, refresh_seconds: float = 5.0):
+        """
+        Initialize the IndexDaemon.
+
+        Args:
+            socket_path: Unix domain socket to listen on
+            pack_dir: Directory for the content packs and classifications
+            import_cache_dir: Directory for the parsed imports
+            refresh_seconds: Minimum time between refreshes of the same repository
+        """
+        self.socket_path = Path(socket_path).expanduser()
+        self.pack_dir = str(Path(pack_dir).expanduser())
+        self.import_cache_dir = import_cache_dir
+        self.classifier = ContentClassifier()
+        self.refresh_seconds = refresh_seconds
+        self._repos: Dict[str, RepoIndex] = {}
+        self._repos_lock = threading.Lock()
+
+    def _get_repo(self, base_path: str) -> RepoIndex:
+        root = str(Path(base_path).resolve())
+        with self._repos_lock:
+            if root not in self._repos:
+                self._repos[root] = RepoIndex(
+                    root,
+                    pack_path_for(self.pack_dir, root),
+                    import_cache_path_for(self.import_cache_dir, root),
+                    self.classifier,
+                    self.refresh_seconds,
+                )
+            return self._repos[root]
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Serve a single client request.
+
+        Args:
+            request: The decoded request; "index" is the only op
+
+        Returns:
+            The response to send back
+        """
+        op = request.get("op")
+        if op == "index":
+            base_path = request["base_path"]
+            if not Path(base_path).is_dir():
+                return {"error": f"Not a directory: {base_path}"}
+            repo = self._get_repo(base_path)
+            repo.request_refresh()
+            return repo.describe()
+        return {"error": f"Unknown op: {op}"}
+
+    def serve_forever(self) -> None:
+        """
+        Listen on the socket until interrupted.
+
+        Raises:
+            DaemonAlreadyRunning: If another daemon answers on the socket
+        """
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if self._socket_answers():
+                raise DaemonAlreadyRunning(f"An index daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+        with _DaemonServer(str(self.socket_path), self) as server:
+            os.chmod(self.socket_path, 0o600)
+            logger.info(f"Index daemon listening on {self.socket_path}")
+            try:
+                server.serve_forever()
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+
+
+    def _socket_answers(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(1.0)
+            try:
+                connection.connect(str(self.socket_path))
+            except OSError:
+                return False
+        return True
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            response = self.server.index_daemon.handle_request(json.loads(self.rfile.readline()))
+        except Exception as e:
+            logger.error(f"Index daemon request failed: {e}")
+            response = {"error": str(e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+
+
+class _DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, index_daemon: IndexDaemon):
+        self.index_daemon = index_daemon
+        super().__init__(socket_path, _RequestHandler)
+
+
+class IndexClient:
+    """Client side of the IndexDaemon protocol; every failure means "use in-process mode"."""
+
+    def __init__(self, socket_path: str, timeout: float = 5.0):
+        self.socket_path = Path(socket_path).expanduser()
+        self.timeout = timeout
+
+    def _request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.socket_path.exists():
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout)
+                connection.connect(str(self.socket_path))
+                connection.sendall(json.dumps(request).encode('utf-8') + b"\n")
+                with connection.makefile('rb') as reader:
+                    response = json.loads(reader.readline())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Index daemon at {self.socket_path} unavailable: {e}")
+            return None
+        if "error" in response:
+            logger.warning(f"Index daemon error: {response['error']}")
+            return None
+        return response
+
+    def get_index(self, base_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Ask the daemon for the index of a repository. The daemon answers right away
+        and refreshes the index in the background, so it may lag recent edits;
+        CodeReader checks every file against the filesystem anyway.
+
+        Args:
+            base_path: Root directory of the repository
+
+        Returns:
+            The pack_path (None until the first pack is written; its classification is saved
+            next to it) and import_cache_path, or None if the daemon is not available
+        """
+        return self._request({"op": "index", "base_path": str(Path(base_path).resolve())})
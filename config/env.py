@@ -9,7 +9,15 @@ load_dotenv()
 env_config: Dict[str, Any] = {
     "anthropic_api_key": os.environ.get("ANTHROPIC_API_KEY", ""),
     # Google API configurations
-    "gemini_api_key": os.environ.get("GEMINI_API_KEY", "")
+    "gemini_api_key": os.environ.get("GEMINI_API_KEY", ""),
+    # Directory for content packs used to warm start large repositories (disabled if empty)
+    "pack_dir": os.environ.get("CODE_ORACLE_PACK_DIR", ""),
+    # Unix socket of the shared index daemon; MCP servers fall back to in-process indexing without it
+    "daemon_socket": os.environ.get("CODE_ORACLE_DAEMON_SOCKET", "~/.cache/code-oracle/indexer.sock"),
+    # The daemon's own packs, kept apart from in-process packs so the two never rewrite each other's
+    "daemon_pack_dir": os.environ.get("CODE_ORACLE_DAEMON_PACK_DIR", "~/.cache/code-oracle/daemon-packs"),
+    # Directory for the parsed imports behind the repo map, so files are only parsed again when they change
+    "import_cache_dir": os.environ.get("CODE_ORACLE_IMPORT_CACHE_DIR", "~/.cache/code-oracle/imports"),
 }
 
 # Function to validate required environment variables
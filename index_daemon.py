@@ -0,0 +1,10 @@
+from app.util.index_daemon import IndexDaemon
+from config.env import env_config
+
+
+def main() -> None:
+    daemon = IndexDaemon(env_config["daemon_socket"], env_config["daemon_pack_dir"], env_config["import_cache_dir"])
+    daemon.serve_forever()
+
+if __name__ == "__main__":
+    main()
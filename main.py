@@ -1,21 +1,52 @@
 from app.ai.agents.code_location_agent import CodeLocationAgent
 from app.ai.tools.read_code import CodeReader
-from app.util.file_acceptor import FileAcceptor
-from app.util.file_traverser import FileTraverser
-import sys
+from app.util.diff_scope import DiffScope
+from app.util.import_graph import ImportCache
+from config.env import env_config
+import argparse
+import asyncio
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Answer questions about a codebase")
+    parser.add_argument("base_path", nargs="?", default=".", help="Root directory of the codebase")
+    parser.add_argument("question", nargs="*", help="Question to answer; asked interactively if omitted")
+    parser.add_argument("--scope", help='Restrict to a git range (e.g. "main...feature") or "working-tree" and its import neighbors')
+    parser.add_argument("--diff-hunks", action="store_true", help="With --scope, show the agent diff hunks instead of full changed files")
+    parser.add_argument("--stream", action="store_true", help="Print files read, candidate files and the answer as they are produced")
+    return parser.parse_args()
     
 def main() -> None:
-    base_path = sys.argv[1] if len(sys.argv) > 1 else "."
-    code_reader = CodeReader(base_path)
+    args = parse_args()
+    scope = DiffScope(args.base_path, args.scope, hunks_only=args.diff_hunks) if args.scope else None
+    code_reader = CodeReader(args.base_path, scope=scope)
     print(code_reader.get_file_structure())
-    code_location_agent = CodeLocationAgent(code_reader=code_reader)
+    import_cache = ImportCache.for_repository(env_config["import_cache_dir"], args.base_path)
+    code_location_agent = CodeLocationAgent(code_reader=code_reader, import_cache=import_cache)
     
-    if len(sys.argv) > 1:
-        question = " ".join(sys.argv[1:])
+    if args.question:
+        question = " ".join(args.question)
     else:
         question = input("Enter your question about the codebase: ")
     
+    if args.stream:
+        asyncio.run(stream_answer(code_location_agent, question))
+        return
     print(code_location_agent.answer_question(question))
+    print(f"\nBudget: {code_location_agent.get_budget_report()}")
+
+async def stream_answer(code_location_agent: CodeLocationAgent, question: str) -> None:
+    async for event in code_location_agent.answer_question_stream(question):
+        if event["type"] == "answer_delta":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "file_read":
+            print(f"\n> read [{event['index']}] {event['path']}", flush=True)
+        elif event["type"] == "candidates":
+            print(f"\n> candidates: {', '.join(str(f['index']) for f in event['files'])}", flush=True)
+        else:
+            print(f"\n\n{event['answer']}")
+            print(f"\nBudget: {event['budget']}")
+            print(f"Timings: {event['timings']}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,7 +1,19 @@
+import asyncio
 import json
-from fastmcp import FastMCP
+import time
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, Dict
+
+from fastmcp import Context, FastMCP
 
 from app.ai.tools.read_code import CodeReader
+from app.util.content_classifier import ContentClassifier
+from app.util.content_pack import pack_path_for
+from app.util.diff_scope import DiffScope
+from app.util.import_graph import ImportCache
+from app.util.index_daemon import IndexClient
+from config.env import env_config
 from app.ai.agents.code_location_agent import CodeLocationAgent
 
 mcp: FastMCP = FastMCP("Code Oracle MCP")
@@ -15,8 +27,88 @@ Parameters:
     name (str): The name of the MCP server, displayed to users in Claude Desktop and Cursor.
 """
 
+# Shared across calls so files are only sniffed again when they change
+content_classifier = ContentClassifier()
+index_client = IndexClient(env_config["daemon_socket"])
+
+def _get_pack_path(base_path: str, revision: str | None, scope: str | None, index: Dict[str, Any] | None) -> str | None:
+    """Use the shared index daemon's pack when it has one, else this process's own pack if configured."""
+    if revision or scope:
+        return None
+    if index is not None and index["pack_path"] is not None:
+        return index["pack_path"]
+    pack_dir = env_config["pack_dir"]
+    return str(pack_path_for(pack_dir, base_path)) if pack_dir else None
+
+def _get_import_cache(base_path: str, index: Dict[str, Any] | None) -> ImportCache:
+    if index is not None:
+        return ImportCache.shared(Path(index["import_cache_path"]))
+    return ImportCache.for_repository(env_config["import_cache_dir"], base_path)
+
+def _create_agent(
+    base_path: str,
+    revision: str | None,
+    include_generated: bool,
+    scope: str | None,
+    diff_hunks: bool,
+) -> CodeLocationAgent:
+    """Set up the reader and agent, including the daemon round-trip and git calls; blocking, so run it in a worker thread."""
+    # Scoped questions list their few files from git, so they skip the whole-repository index
+    index = None if revision or scope else index_client.get_index(base_path)
+    code_reader = CodeReader(
+        base_path,
+        revision=revision,
+        pack_path=_get_pack_path(base_path, revision, scope, index),
+        # The daemon keeps its own packs up to date
+        update_pack=index is None or index["pack_path"] is None,
+        include_generated=include_generated,
+        classifier=content_classifier,
+        scope=DiffScope(base_path, scope, hunks_only=diff_hunks) if scope else None,
+    )
+    try:
+        return CodeLocationAgent(code_reader=code_reader, import_cache=_get_import_cache(base_path, index))
+    except Exception:
+        code_reader.close()
+        raise
+
+ANSWER_FLUSH_CHARS = 200
+
+class ProgressReporter:
+    """Turns the agent's progress events into MCP log and progress notifications."""
+
+    def __init__(self, ctx: Context, max_iterations: int):
+        self.ctx = ctx
+        self.max_iterations = max_iterations
+        self._pending_text = ""
+
+    async def report(self, event: Dict[str, Any], iterations: int) -> None:
+        if event["type"] == "answer_delta":
+            self._pending_text += event["text"]
+            if "\n" in event["text"] or len(self._pending_text) >= ANSWER_FLUSH_CHARS:
+                await self.flush()
+            return
+        await self.flush()
+        if event["type"] == "file_read":
+            await self.ctx.info(f"Read [{event['index']}] {event['path']}")
+            await self.ctx.report_progress(min(iterations, self.max_iterations), self.max_iterations)
+        elif event["type"] == "candidates":
+            await self.ctx.info("Candidate files: " + ", ".join(f"[{f['index']}] {f['path']}" for f in event["files"]))
+
+    async def flush(self) -> None:
+        if self._pending_text.strip():
+            await self.ctx.info(self._pending_text)
+        self._pending_text = ""
+
 @mcp.tool()
-def answer_codebase_question(base_path: str, question: str) -> str:
+async def answer_codebase_question(
+    base_path: str,
+    question: str,
+    ctx: Context,
+    revision: str | None = None,
+    include_generated: bool = False,
+    scope: str | None = None,
+    diff_hunks: bool = False,
+) -> str:
     """
     Answer a question about the codebase by locating relevant code.
     
@@ -27,16 +119,48 @@ def answer_codebase_question(base_path: str, question: str) -> str:
     Parameters:
         base_path (str): The root directory path of the codebase to analyze.
         question (str): A natural language question about the codebase.
+        revision (str | None): Optional git revision (commit, branch or tag) to answer the
+            question against. The files are read from git objects without a checkout.
+            Defaults to the current working tree.
+        include_generated (bool): Also list generated, vendored, minified and lock files,
+            which are hidden from the agent by default.
+        scope (str | None): Optional git range (e.g. "main...feature") or "working-tree" for
+            uncommitted changes. Restricts the question to the changed files and the files they
+            import or are imported by, which is much faster on large repositories.
+        diff_hunks (bool): With a scope, give the agent the diff hunks of changed files
+            instead of their full contents.
         
+    While it runs, the start and end of indexing, the files the agent reads, the candidate
+    files it is considering and the partial answer text are sent as log notifications, and
+    progress is reported in agent iterations. Cancelling the request stops the agent.
+
     Returns:
         str: A JSON string containing the answer to the question, with relevant file 
-             references if applicable.
+             references if applicable, the iterations, estimated tokens and time it consumed,
+             the indexing time, and the time from the call to the agent's first progress notification.
     """
-    code_reader = CodeReader(base_path)
-    code_location_agent = CodeLocationAgent(code_reader=code_reader)
-    answer = code_location_agent.answer_question(question)
+    started = time.monotonic()
+    # Listing, classification and the repo map can take a while on large repositories
+    await ctx.info(f"Indexing {base_path}")
+    code_location_agent = await asyncio.to_thread(_create_agent, base_path, revision, include_generated, scope, diff_hunks)
+    setup_seconds = time.monotonic() - started
+    await ctx.info(f"Indexed {len(code_location_agent.code_reader.file_paths)} files in {setup_seconds:.1f}s")
+    try:
+        reporter = ProgressReporter(ctx, code_location_agent.max_iterations)
+        result: Dict[str, Any] = {}
+        async with aclosing(code_location_agent.answer_question_stream(question, started)) as events:
+            async for event in events:
+                if event["type"] == "answer":
+                    result = event
+                else:
+                    await reporter.report(event, code_location_agent.get_budget_report()["iterations"])
+        await reporter.flush()
+    finally:
+        code_location_agent.code_reader.close()
     answer_dict = {
-        "answer": answer,
+        "answer": result["answer"],
+        "budget": result["budget"],
+        "timings": {**result["timings"], "setup_seconds": round(setup_seconds, 3)},
     }
     return json.dumps(answer_dict)
 
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Iterator, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers with prepared replies and records the tool_choice of every call.
+    When streamed, each reply arrives as two text chunks, the second carrying the tool calls.
+    """
+
+    replies: List[AIMessage]
+    structured: List[Any] = Field(default_factory=list)
+    tool_choices: List[Any] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next_reply(self, kwargs: Any) -> AIMessage:
+        self.tool_choices.append(kwargs.get("tool_choice"))
+        return self.replies.pop(0)
+
+    def _generate(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._next_reply(kwargs))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        reply = self._next_reply(kwargs)
+        text = reply.text()
+        tool_call_chunks = [
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+            for index, call in enumerate(reply.tool_calls)
+        ]
+        yield ChatGenerationChunk(message=AIMessageChunk(content=text[:len(text) // 2]))
+        yield ChatGenerationChunk(message=AIMessageChunk(content=text[len(text) // 2:], tool_call_chunks=tool_call_chunks))
+
+    def bind_tools(self, tools: Any, tool_choice: Any = None, **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        return RunnableLambda(lambda _: self.structured.pop(0))
+
+
+def tool_call(name: str, **args: Any) -> AIMessage:
+    """A model reply that calls one tool."""
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call-{name}-{id(args)}"}])
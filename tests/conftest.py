@@ -0,0 +1,44 @@
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+# config.env refuses to import without a key; tests never reach the real models
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+FileWriter = Callable[[Dict[str, str]], Path]
+GitRunner = Callable[..., str]
+
+
+@pytest.fixture
+def write_files(tmp_path: Path) -> FileWriter:
+    """Write files given as {relative path: content} under a fresh directory and return it."""
+    root = tmp_path / "repo"
+    root.mkdir()
+
+    def write(files: Dict[str, str]) -> Path:
+        for relative_path, content in files.items():
+            file_path = root / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+        return root
+
+    return write
+
+
+@pytest.fixture
+def git(write_files: FileWriter) -> GitRunner:
+    """Run git in an initialized repository rooted at the write_files directory."""
+    root = write_files({})
+
+    def run(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=root, check=True, capture_output=True, text=True).stdout
+
+    run("init", "-q", "-b", "main")
+    run("config", "user.email", "dev@example.com")
+    run("config", "user.name", "Dev")
+    run("config", "commit.gpgsign", "false")
+    return run
+
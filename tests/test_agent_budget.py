@@ -0,0 +1,47 @@
+from app.ai.agent_core.agent_budget import AgentBudget, estimate_tokens
+
+
+def test_iteration_limit_leaves_room_for_final_answer():
+    budget = AgentBudget(max_iterations=3)
+    budget.record_call(10, 10)
+    assert budget.exhausted_reason(10) is None
+
+    budget.record_call(10, 10)
+    assert budget.exhausted_reason(10) == "iteration"
+
+
+def test_time_limit_reserves_answer_time():
+    assert AgentBudget(deadline_seconds=5.0, reserve_seconds=10.0).exhausted_reason(10) == "time"
+    assert AgentBudget(deadline_seconds=60.0, reserve_seconds=10.0).exhausted_reason(10) is None
+
+
+def test_token_limit_fits_next_call_and_final_answer():
+    budget = AgentBudget(max_tokens=10_000, reserve_output_tokens=1000)
+
+    assert budget.exhausted_reason(4000) is None
+    assert budget.exhausted_reason(4001) == "token"
+
+    budget.record_call(1000, 1000)
+    assert budget.exhausted_reason(3000) is None
+    assert budget.exhausted_reason(3001) == "token"
+
+
+def test_start_resets_consumption():
+    budget = AgentBudget(max_iterations=2)
+    budget.record_call(100, 100)
+    budget.stop_reason = "iteration"
+
+    budget.start()
+
+    assert budget.exhausted_reason(10) is None
+    assert budget.report()["estimated_tokens"] == 0
+    assert budget.report()["stop_reason"] is None
+
+
+def test_estimate_tokens_counts_content_and_tool_args():
+    class Message:
+        content = "a" * 40
+        tool_calls = [{"args": {"indices": [1, 2]}}]
+
+    assert estimate_tokens(["a" * 8]) == 2
+    assert estimate_tokens([Message()]) == (40 + len(str({"indices": [1, 2]}))) // 4
@@ -0,0 +1,59 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+from app.ai.agents.code_location_agent import CodeLocationAgent, RelevantFiles
+from app.ai.tools.read_code import CodeReader
+from app.util.import_graph import ImportCache
+from chat_models import ScriptedChatModel, tool_call
+
+FILES = {
+    ".gitignore": "",
+    "app/main.py": "from app.settings import TIMEOUT\n",
+    "app/settings.py": "TIMEOUT = 30\n",
+}
+
+SETTINGS = 2
+
+ANSWER = f"The timeout is set in [{SETTINGS}]."
+
+
+def scripted_agent(root, replies: list[AIMessage]) -> CodeLocationAgent:
+    code_reader = CodeReader(str(root))
+    assert code_reader.relative_path(SETTINGS) == "app/settings.py"
+    agent = CodeLocationAgent(code_reader=code_reader, import_cache=ImportCache())
+    agent.langchain_service.model = ScriptedChatModel(replies=replies, structured=[RelevantFiles(relevant_files=[SETTINGS])])
+    return agent
+
+
+async def collect(agent: CodeLocationAgent, question: str, **kwargs) -> list[dict]:
+    return [event async for event in agent.answer_question_stream(question, **kwargs)]
+
+
+async def test_stream_reports_reads_candidates_and_answer(write_files):
+    root = write_files(FILES)
+    agent = scripted_agent(root, [tool_call("read_code", indices=[SETTINGS]), AIMessage(content=ANSWER)])
+
+    events = await collect(agent, "Where is the timeout set?")
+
+    assert {"type": "file_read", "index": SETTINGS, "path": "app/settings.py"} in events
+    assert {"type": "candidates", "files": [{"index": SETTINGS, "path": "app/settings.py"}]} in events
+    assert "".join(event["text"] for event in events if event["type"] == "answer_delta") == ANSWER
+    answer = events[-1]
+    assert answer["type"] == "answer"
+    assert answer["answer"].startswith(ANSWER)
+    assert "app/settings.py" in answer["answer"].split("Relevant files:")[1]
+    assert answer["budget"]["iterations"] == 2
+    agent.code_reader.close()
+
+
+async def test_timings_start_at_the_callers_clock(write_files):
+    root = write_files(FILES)
+    agent = scripted_agent(root, [AIMessage(content=ANSWER)])
+
+    events = await collect(agent, "Where is the timeout set?", started=time.monotonic() - 5)
+
+    timings = events[-1]["timings"]
+    assert timings["time_to_first_output_seconds"] >= 5
+    assert timings["total_seconds"] >= timings["time_to_first_output_seconds"]
+    agent.code_reader.close()
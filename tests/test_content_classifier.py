@@ -0,0 +1,80 @@
+import pytest
+
+from app.util.content_classifier import ContentClassifier, classification_path_for
+from app.util.content_pack import ContentPack, PackedSource, open_pack
+from app.util.file_source import WorkingTreeSource
+
+
+@pytest.mark.parametrize(("relative_path", "content", "reason"), [
+    ("uv.lock", "version = 1\n", "lockfile"),
+    ("frontend/package-lock.json", "{}\n", "lockfile"),
+    ("proto/api_pb2.py", "X = 1\n", "generated"),
+    ("static/app.min.js", "var a=1;\n", "minified"),
+    ("vendor/lib.py", "X = 1\n", "vendored"),
+    ("tests/__snapshots__/view.txt", "snapshot\n", "snapshot"),
+    ("models.go", "// Code generated by sqlc. DO NOT EDIT.\npackage db\n", "generated"),
+    ("api.py", "#!/usr/bin/env python\n\n# Generated by the protocol buffer compiler.  DO NOT EDIT!\n", "generated"),
+    ("Form.cs", "//------\n// <auto-generated>\n//------\nclass Form {}\n", "generated"),
+    ("test_markers.py", "import re\n\nMARKER = '// Code generated by x. DO NOT EDIT.'\n", None),
+    ("settings.py", "# Settings for the autogenerated docs\nDOCS = True\n", None),
+    ("data.py", "X = 1\0\n", "binary"),
+    ("bundle.js", "var a=1;" * 700, "minified"),
+    ("app/service.py", "def run():\n    return 1\n" * 200, None),
+])
+def test_classify(write_files, relative_path, content, reason):
+    root = write_files({relative_path: content})
+    source = WorkingTreeSource(str(root))
+
+    assert ContentClassifier().classify(source, root / relative_path) == reason
+
+
+def test_classify_oversized(write_files):
+    root = write_files({"big.py": "X = 1\n" * 10})
+    source = WorkingTreeSource(str(root))
+
+    assert ContentClassifier(max_size_bytes=10).classify(source, root / "big.py") == "oversized"
+
+
+def test_classify_all_returns_hidden_indices(write_files):
+    root = write_files({"a.py": "X = 1\n", "uv.lock": "version = 1\n", "b.py": "Y = 2\n"})
+    source = WorkingTreeSource(str(root))
+    file_paths = [root / "a.py", root / "uv.lock", root / "b.py"]
+
+    assert ContentClassifier().classify_all(source, file_paths) == {1: "lockfile"}
+
+
+def test_saved_classifications_load_into_another_classifier(write_files, tmp_path):
+    root = write_files({"a.py": "X = 1\n", "uv.lock": "version = 1\n"})
+    source = WorkingTreeSource(str(root))
+    file_paths = [root / "a.py", root / "uv.lock"]
+    cache_path = tmp_path / "classes.json"
+    classifier = ContentClassifier()
+    classifier.classify_all(source, file_paths)
+    classifier.save(cache_path, source, file_paths)
+
+    loaded = ContentClassifier()
+    loaded.load(cache_path, str(root))
+
+    assert loaded._cache == classifier._cache
+
+
+def test_cached_classifications_do_not_check_packed_files(write_files, tmp_path):
+    root = write_files({".gitignore": "", "a.py": "X = 1\n", "uv.lock": "version = 1\n", "gen.go": "// Code generated by x. DO NOT EDIT.\n"})
+    working_tree = WorkingTreeSource(str(root))
+    file_paths = working_tree.list_files()
+    pack_path = tmp_path / "repo.pack"
+    ContentPack.write(pack_path, working_tree, file_paths)
+    cache_path = classification_path_for(pack_path)
+    classifier = ContentClassifier()
+    expected = classifier.classify_all(working_tree, file_paths)
+    classifier.save(cache_path, working_tree, file_paths)
+
+    loaded = ContentClassifier()
+    loaded.load(cache_path, str(root))
+    pack = open_pack(pack_path, str(root))
+    assert pack is not None
+    source = PackedSource(str(root), pack, WorkingTreeSource(str(root)))
+
+    assert loaded.classify_all(source, source.list_files()) == expected
+    assert not source._validated and not source._stale
+    source.close()
@@ -0,0 +1,130 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.util.content_pack import ContentPack, PackedSource, open_pack
+from app.util.file_source import WorkingTreeSource
+
+FILES = {
+    ".gitignore": "*.log\n",
+    "a.py": "import b\n",
+    "b.py": "VALUE = 1\n",
+    "pkg/c.py": "from b import VALUE\n",
+}
+
+
+def relative_paths(root: Path, file_paths: list[Path]) -> list[str]:
+    return sorted(file_path.relative_to(root).as_posix() for file_path in file_paths)
+
+
+def bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def write_pack(root: Path, pack_path: Path, compress: bool = False) -> None:
+    source = WorkingTreeSource(str(root))
+    ContentPack.write(pack_path, source, source.list_files(), compress)
+
+
+def open_packed_source(root: Path, pack_path: Path) -> PackedSource:
+    pack = open_pack(pack_path, str(root))
+    assert pack is not None
+    return PackedSource(str(root), pack, WorkingTreeSource(str(root)))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(write_files, tmp_path, compress):
+    root = write_files(FILES)
+    pack_path = tmp_path / "packs" / "repo.pack"
+    write_pack(root, pack_path, compress)
+
+    source = open_packed_source(root, pack_path)
+    file_paths = source.list_files()
+
+    assert relative_paths(root, file_paths) == sorted(FILES)
+    for file_path in file_paths:
+        assert source.read_text(file_path) == FILES[file_path.relative_to(root).as_posix()]
+    assert not source.table_changed
+    assert not source.outdated
+    source.close()
+
+
+def test_stale_file_is_served_from_disk(write_files, tmp_path):
+    root = write_files(FILES)
+    pack_path = tmp_path / "repo.pack"
+    write_pack(root, pack_path)
+    (root / "b.py").write_text("VALUE = 22\n")
+    bump_mtime(root / "b.py")
+
+    source = open_packed_source(root, pack_path)
+
+    assert source.read_text(root / "b.py") == "VALUE = 22\n"
+    assert source.fingerprint(root / "b.py") == (root / "b.py").stat().st_mtime_ns
+    assert source.file_size(root / "b.py") == len("VALUE = 22\n")
+    assert source.read_text(root / "a.py") == FILES["a.py"]
+    assert source.outdated
+    source.close()
+
+
+def test_added_and_removed_files_are_listed(write_files, tmp_path):
+    root = write_files(FILES)
+    pack_path = tmp_path / "repo.pack"
+    write_pack(root, pack_path)
+    (root / "a.py").unlink()
+    (root / "pkg" / "new.py").write_text("NEW = True\n")
+    bump_mtime(root)
+    bump_mtime(root / "pkg")
+
+    source = open_packed_source(root, pack_path)
+    file_paths = source.list_files()
+
+    assert relative_paths(root, file_paths) == [".gitignore", "b.py", "pkg/c.py", "pkg/new.py"]
+    assert source.read_text(root / "pkg" / "new.py") == "NEW = True\n"
+    assert source.table_changed
+    source.close()
+
+
+def test_rewritten_pack_is_current_again(write_files, tmp_path):
+    root = write_files(FILES)
+    pack_path = tmp_path / "repo.pack"
+    write_pack(root, pack_path)
+    (root / "d.py").write_text("D = 4\n")
+    bump_mtime(root)
+
+    source = open_packed_source(root, pack_path)
+    ContentPack.write(pack_path, source, source.list_files())
+    source.close()
+
+    rewritten = open_packed_source(root, pack_path)
+    assert relative_paths(root, rewritten.list_files()) == sorted([*FILES, "d.py"])
+    assert not rewritten.table_changed
+    rewritten.close()
+
+
+def test_open_pack_rejects_missing_and_foreign_packs(write_files, tmp_path):
+    root = write_files(FILES)
+    pack_path = tmp_path / "repo.pack"
+    assert open_pack(pack_path, str(root)) is None
+
+    write_pack(root, pack_path)
+    assert open_pack(pack_path, str(tmp_path)) is None
+
+    pack_path.write_bytes(b"not a pack")
+    assert open_pack(pack_path, str(root)) is None
+
+
+def test_undecodable_file_keeps_its_place_in_the_table(write_files, tmp_path):
+    root = write_files(FILES)
+    (root / "latin.py").write_bytes("NAME = 'caf\xe9'\n".encode('latin-1'))
+    pack_path = tmp_path / "repo.pack"
+    cold_paths = WorkingTreeSource(str(root)).list_files()
+    write_pack(root, pack_path)
+
+    source = open_packed_source(root, pack_path)
+
+    assert root / "latin.py" in cold_paths
+    assert source.list_files() == cold_paths
+    assert source.read_bytes(root / "latin.py") == (root / "latin.py").read_bytes()
+    source.close()
@@ -0,0 +1,89 @@
+import pytest
+
+from app.util.diff_scope import DiffScope
+from app.util.file_source import WorkingTreeSource
+from app.util.git_source import GitSource
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/core.py": "def compute():\n    return 1\n",
+    "pkg/user.py": "from pkg.core import compute\n",
+    "pkg/other.py": "def unrelated():\n    return 2\n",
+    "app.py": "from pkg import core\n",
+}
+
+
+@pytest.fixture
+def repo(write_files, git):
+    root = write_files(FILES)
+    git("add", "-A")
+    git("commit", "-q", "-m", "initial")
+    write_files({"pkg/core.py": "def compute():\n    return 42\n"})
+    return root
+
+
+def relative_paths(root, file_paths):
+    return sorted(file_path.relative_to(root).as_posix() for file_path in file_paths)
+
+
+def test_working_tree_changes(repo):
+    scope = DiffScope(str(repo))
+
+    assert scope.changed == {"pkg/core.py"}
+
+
+def test_restrict_keeps_changed_files_and_import_neighbors(repo):
+    scope = DiffScope(str(repo))
+    source = WorkingTreeSource(str(repo))
+
+    in_scope = scope.restrict(source, source.list_files())
+
+    assert relative_paths(repo, in_scope) == ["app.py", "pkg/core.py", "pkg/user.py"]
+
+
+def test_hunks_only_keeps_diffs_of_changed_files(repo):
+    scope = DiffScope(str(repo), hunks_only=True)
+
+    hunks = scope.get_hunks("pkg/core.py")
+
+    assert hunks is not None
+    assert "+    return 42" in hunks
+    assert scope.get_hunks("pkg/user.py") is None
+    assert DiffScope(str(repo)).get_hunks("pkg/core.py") is None
+
+
+def test_committed_range_against_revision(repo, git):
+    git("commit", "-q", "-am", "change core")
+    scope = DiffScope(str(repo), "HEAD~1..HEAD")
+    source = GitSource(str(repo), "HEAD")
+
+    in_scope = scope.list_files(source, "HEAD")
+
+    assert scope.changed == {"pkg/core.py"}
+    assert relative_paths(repo, in_scope) == ["app.py", "pkg/core.py", "pkg/user.py"]
+    source.close()
+
+
+def test_list_files_includes_untracked_and_skips_deleted(repo, write_files):
+    write_files({"pkg/new.py": "from pkg.core import compute\n"})
+    (repo / "pkg" / "user.py").unlink()
+    scope = DiffScope(str(repo))
+
+    in_scope = scope.list_files(WorkingTreeSource(str(repo)))
+
+    assert scope.changed == {"pkg/core.py", "pkg/new.py"}
+    assert relative_paths(repo, in_scope) == ["app.py", "pkg/core.py", "pkg/new.py"]
+
+
+def test_hunks_ignore_user_diff_config(repo, git):
+    git("config", "diff.mnemonicPrefix", "true")
+    git("config", "color.diff", "always")
+    git("config", "diff.external", "true")
+    scope = DiffScope(str(repo), hunks_only=True)
+
+    hunks = scope.get_hunks("pkg/core.py")
+
+    assert scope.changed == {"pkg/core.py"}
+    assert hunks is not None
+    assert "\x1b[" not in hunks
+    assert "+    return 42" in hunks
@@ -0,0 +1,81 @@
+import pytest
+
+from app.util.content_classifier import ContentClassifier
+from app.util.git_source import GitError, GitSource
+
+
+@pytest.fixture
+def committed_repo(write_files, git):
+    root = write_files({
+        "main.py": "print('committed')\n",
+        "pkg/util.py": "X = 1\n",
+        "logo.png": "not really a png",
+        "node_modules/dep/index.js": "module.exports = 1\n",
+    })
+    git("add", "-A")
+    git("commit", "-q", "-m", "initial")
+    return root
+
+
+def test_lists_tracked_files_with_traversal_rules(committed_repo):
+    source = GitSource(str(committed_repo), "HEAD")
+
+    listed = sorted(file_path.relative_to(committed_repo).as_posix() for file_path in source.list_files())
+
+    assert listed == ["main.py", "pkg/util.py"]
+    source.close()
+
+
+def test_reads_committed_content_not_working_tree(committed_repo, write_files):
+    write_files({"main.py": "print('edited')\n", "untracked.py": "Y = 2\n"})
+    source = GitSource(str(committed_repo), "HEAD")
+    file_paths = source.list_files()
+
+    assert committed_repo / "untracked.py" not in file_paths
+    assert source.read_text(committed_repo / "main.py") == "print('committed')\n"
+    assert source.file_size(committed_repo / "main.py") == len("print('committed')\n")
+    source.close()
+
+
+def test_fingerprint_is_blob_id(committed_repo, git):
+    source = GitSource(str(committed_repo), "HEAD")
+    source.list_files()
+
+    assert source.fingerprint(committed_repo / "pkg" / "util.py") == git("rev-parse", "HEAD:pkg/util.py").strip()
+    source.close()
+
+
+def test_reads_older_revision(committed_repo, write_files, git):
+    write_files({"pkg/util.py": "X = 2\n"})
+    git("commit", "-q", "-am", "second")
+    source = GitSource(str(committed_repo), "HEAD~1")
+    source.list_files()
+
+    assert source.read_text(committed_repo / "pkg" / "util.py") == "X = 1\n"
+    source.close()
+
+
+def test_unknown_revision_raises(committed_repo):
+    with pytest.raises(GitError):
+        GitSource(str(committed_repo), "no-such-branch")
+
+
+def test_classification_does_not_read_blobs(committed_repo, write_files, git):
+    write_files({
+        "uv.lock": "version = 1\n",
+        "gen.go": "// Code generated by x. DO NOT EDIT.\npackage gen\n",
+        "big.py": "X = 1\n" * 30,
+    })
+    git("add", "-A")
+    git("commit", "-q", "-m", "more")
+    source = GitSource(str(committed_repo), "HEAD")
+    file_paths = source.list_files()
+    source._cat_file.read = None
+
+    reasons = ContentClassifier(max_size_bytes=100).classify_all(source, file_paths)
+
+    assert sorted((file_paths[index].name, reason) for index, reason in reasons.items()) == [
+        ("big.py", "oversized"),
+        ("uv.lock", "lockfile"),
+    ]
+    source.close()
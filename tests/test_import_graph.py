@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from app.util.import_graph import ImportCache, ImportResolver, build_import_edges, pagerank, parse_imports
+
+PATHS = [
+    "pkg/__init__.py",
+    "pkg/a.py",
+    "pkg/sub/b.py",
+    "pkg/sub/__init__.py",
+    "src/lib/helpers.py",
+    "web/app.ts",
+    "web/util.ts",
+    "web/components/index.tsx",
+    "server/main.go",
+    "server/handlers/user.go",
+    "server/handlers/order.go",
+    "java/com/acme/Service.java",
+    "java/com/acme/Repository.java",
+]
+
+
+@pytest.fixture
+def resolver():
+    return ImportResolver(PATHS)
+
+
+def resolved_paths(resolver, relative_path, content):
+    return sorted(PATHS[index] for index in resolver.resolve(relative_path, content))
+
+
+def test_python_relative_imports(resolver):
+    content = "from ..a import thing\nfrom . import b\n"
+
+    assert resolved_paths(resolver, "pkg/sub/b.py", content) == ["pkg/a.py", "pkg/sub/__init__.py"]
+
+
+def test_python_package_init_imports(resolver):
+    content = "from .sub import b\nfrom . import a\n"
+
+    assert resolved_paths(resolver, "pkg/__init__.py", content) == ["pkg/a.py", "pkg/sub/__init__.py", "pkg/sub/b.py"]
+
+
+def test_python_absolute_and_source_root_imports(resolver):
+    content = "import pkg.sub.b\nfrom lib import helpers\nimport os\n"
+
+    assert resolved_paths(resolver, "pkg/a.py", content) == ["pkg/sub/b.py", "src/lib/helpers.py"]
+
+
+def test_python_falls_back_to_regex_on_syntax_errors(resolver):
+    content = "from .a import thing\ndef broken(:\n"
+
+    assert resolved_paths(resolver, "pkg/__init__.py", content) == ["pkg/a.py"]
+
+
+def test_js_imports(resolver):
+    content = (
+        "import { x } from './util'\n"
+        "const c = require('./components')\n"
+        "import React from 'react'\n"
+    )
+
+    assert resolved_paths(resolver, "web/app.ts", content) == ["web/components/index.tsx", "web/util.ts"]
+
+
+def test_go_imports_match_module_path_suffix(resolver):
+    content = 'package main\n\nimport (\n\t"fmt"\n\t"github.com/acme/shop/server/handlers"\n)\n'
+
+    assert resolved_paths(resolver, "server/main.go", content) == ["server/handlers/order.go", "server/handlers/user.go"]
+
+
+def test_java_imports(resolver):
+    content = "package com.acme;\n\nimport com.acme.Repository;\nimport java.util.List;\n"
+
+    assert resolved_paths(resolver, "java/com/acme/Service.java", content) == ["java/com/acme/Repository.java"]
+
+
+def test_self_imports_are_dropped(resolver):
+    assert resolver.resolve("pkg/a.py", "import pkg.a\n") == []
+
+
+def test_import_cache_round_trip(tmp_path):
+    cache_path = tmp_path / "imports" / "repo.imports.json"
+    cache = ImportCache(cache_path)
+    cache.put("pkg/a.py", 1, ["pkg.sub.b"])
+    cache.put("pkg/a.py", 2, ["pkg.sub"])
+    cache.put("web/app.ts", "abc123", ["web/util"])
+    cache.save()
+
+    loaded = ImportCache(cache_path)
+    loaded.load()
+
+    assert loaded.get("pkg/a.py", 2) == ["pkg.sub"]
+    assert loaded.get("pkg/a.py", 1) is None
+    assert loaded.get("web/app.ts", "abc123") == ["web/util"]
+
+
+def test_build_import_edges(resolver):
+    files = [
+        (1, "pkg/a.py", parse_imports("pkg/a.py", "import pkg.sub.b\n")),
+        (2, "pkg/sub/b.py", parse_imports("pkg/sub/b.py", "from ..a import x\n")),
+        (5, "web/app.ts", parse_imports("web/app.ts", "import './util'\n")),
+    ]
+
+    sources, targets = build_import_edges(resolver, files)
+
+    assert list(zip(sources.tolist(), targets.tolist())) == [(1, 2), (2, 1), (5, 6)]
+
+
+def test_pagerank_ranks_imported_files_highest():
+    # 0 imports 1, 1 imports 2; 2 and 3 import nothing (dangling)
+    scores = pagerank(4, np.array([0, 1]), np.array([1, 2]))
+
+    assert scores.sum() == pytest.approx(1.0)
+    assert scores[2] > scores[1] > scores[0]
+    assert scores[0] == pytest.approx(scores[3])
+
+
+def test_pagerank_without_edges_is_uniform():
+    scores = pagerank(3, np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+
+    assert scores == pytest.approx([1 / 3] * 3)
+
+
+def test_pagerank_of_empty_graph():
+    assert pagerank(0, np.array([], dtype=np.int64), np.array([], dtype=np.int64)).size == 0
@@ -0,0 +1,147 @@
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.util.content_classifier import ContentClassifier
+from app.util.content_pack import open_pack
+from app.util.import_graph import ImportCache
+from app.util.index_daemon import DaemonAlreadyRunning, IndexClient, IndexDaemon, RepoIndex
+
+FILES = {
+    ".gitignore": "",
+    "app/main.py": "from app.settings import TIMEOUT\n",
+    "app/settings.py": "TIMEOUT = 30\n",
+    "uv.lock": "version = 1\n",
+}
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters, too few for pytest's tmp_path
+    directory = tempfile.mkdtemp(prefix="oracle-")
+    yield Path(directory) / "indexer.sock"
+    shutil.rmtree(directory)
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def accepts_connections(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def start_daemon(socket_path: Path, tmp_path: Path) -> IndexDaemon:
+    daemon = IndexDaemon(str(socket_path), str(tmp_path / "packs"), str(tmp_path / "imports"))
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    wait_until(lambda: accepts_connections(socket_path))
+    return daemon
+
+
+def repo_index(root: Path, tmp_path: Path, refresh_seconds: float = 60.0) -> RepoIndex:
+    return RepoIndex(str(root), tmp_path / "repo.pack", tmp_path / "repo.imports.json", ContentClassifier(), refresh_seconds)
+
+
+def test_refresh_writes_pack_classification_and_imports(write_files, tmp_path):
+    root = write_files(FILES)
+    index = repo_index(root, tmp_path)
+    assert index.describe()["pack_path"] is None
+
+    index._refresh()
+
+    pack = open_pack(Path(index.describe()["pack_path"]), str(root))
+    assert pack is not None
+    assert sorted(pack.entries) == sorted(FILES)
+    pack.close()
+    loaded = ContentClassifier()
+    loaded.load(index.classification_path, str(root))
+    assert "lockfile" in loaded._cache.values()
+    imports = ImportCache(tmp_path / "repo.imports.json")
+    imports.load()
+    assert imports.get("app/main.py", (root / "app" / "main.py").stat().st_mtime_ns) == ["app.settings", "app.settings.TIMEOUT"]
+
+
+def test_refresh_picks_up_edits(write_files, tmp_path):
+    root = write_files(FILES)
+    index = repo_index(root, tmp_path)
+    index._refresh()
+    write_files({"app/settings.py": "TIMEOUT = 60\n", "app/new.py": "NEW = 1\n"})
+
+    index._refresh()
+
+    pack = open_pack(index.pack_path, str(root))
+    assert pack is not None
+    assert bytes(pack.read_bytes("app/settings.py")) == b"TIMEOUT = 60\n"
+    assert "app/new.py" in pack.entries
+    pack.close()
+
+
+def test_request_refresh_runs_in_the_background_at_most_every_refresh_seconds(write_files, tmp_path):
+    root = write_files(FILES)
+    index = repo_index(root, tmp_path)
+
+    index.request_refresh()
+    wait_until(lambda: index._refreshed_at is not None)
+    index.request_refresh()
+
+    assert index.describe()["pack_path"] is not None
+    assert not index._refreshing
+
+
+def test_handle_request_rejects_bad_requests(tmp_path):
+    daemon = IndexDaemon(str(tmp_path / "indexer.sock"), str(tmp_path / "packs"), str(tmp_path / "imports"))
+
+    assert "error" in daemon.handle_request({"op": "index", "base_path": str(tmp_path / "missing")})
+    assert "error" in daemon.handle_request({"op": "unknown"})
+
+
+def test_client_gets_the_index_from_a_running_daemon(write_files, tmp_path, socket_path):
+    root = write_files(FILES)
+    start_daemon(socket_path, tmp_path)
+    client = IndexClient(str(socket_path))
+
+    index = client.get_index(str(root))
+
+    assert index is not None
+    assert set(index) == {"pack_path", "import_cache_path"}
+    wait_until(lambda: client.get_index(str(root))["pack_path"] is not None)
+
+
+def test_client_falls_back_without_a_daemon(tmp_path, socket_path):
+    client = IndexClient(str(socket_path), timeout=0.5)
+    assert client.get_index(str(tmp_path)) is None
+
+    # A socket file left behind by a daemon that died
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+    assert client.get_index(str(tmp_path)) is None
+
+
+def test_second_daemon_refuses_to_take_the_socket(tmp_path, socket_path):
+    start_daemon(socket_path, tmp_path)
+
+    with pytest.raises(DaemonAlreadyRunning):
+        IndexDaemon(str(socket_path), str(tmp_path / "packs"), str(tmp_path / "imports")).serve_forever()
+    assert accepts_connections(socket_path)
+
+
+def test_daemon_replaces_a_stale_socket(tmp_path, socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+
+    start_daemon(socket_path, tmp_path)
+
+    assert accepts_connections(socket_path)
@@ -0,0 +1,71 @@
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import tool
+from pydantic import BaseModel
+
+from app.ai.agent_core.agent_budget import AgentBudget
+from app.ai.agent_core.langchain_service import LangChainService
+from chat_models import ScriptedChatModel, tool_call
+
+
+@tool
+def lookup(key: str) -> str:
+    """Look up a value by key."""
+    return f"value of {key}"
+
+
+class Answer(BaseModel):
+    files: list[int]
+
+
+def scripted_service(replies: list[AIMessage], max_iterations: int = 3) -> LangChainService:
+    service = LangChainService("You answer questions.", model_type="anthropic-claude-3-7", budget=AgentBudget(max_iterations=max_iterations))
+    service.model = ScriptedChatModel(replies=replies)
+    return service
+
+
+def test_iteration_cap_forces_a_tool_free_final_answer():
+    replies = [tool_call("lookup", key="a"), tool_call("lookup", key="b"), AIMessage(content="final answer")]
+    service = scripted_service(replies)
+
+    steps = service.execute("question", [lookup])
+
+    assert steps[-1].content == "final answer"
+    assert [type(step) for step in steps].count(ToolMessage) == 2
+    assert service.model.tool_choices == [None, None, {"type": "none"}]
+    assert service.budget.iterations == 3
+    assert service.budget.stop_reason == "iteration"
+
+
+def test_tool_calls_in_the_forced_answer_fall_back_to_the_last_text():
+    replies = [
+        AIMessage(content="core.py looks relevant", tool_calls=[{"name": "lookup", "args": {"key": "a"}, "id": "1"}]),
+        tool_call("lookup", key="b"),
+        tool_call("lookup", key="c"),
+    ]
+    service = scripted_service(replies)
+
+    steps = service.execute("question", [lookup])
+
+    assert not steps[-1].tool_calls
+    assert steps[-1].content == "core.py looks relevant"
+
+
+def test_run_within_budget_is_not_cut_short():
+    service = scripted_service([tool_call("lookup", key="a"), AIMessage(content="done")], max_iterations=10)
+
+    steps = service.execute("question", [lookup])
+
+    assert steps[-1].content == "done"
+    assert service.budget.stop_reason is None
+    assert service.budget.iterations == 2
+
+
+def test_structured_follow_up_counts_tokens_but_not_an_iteration():
+    service = scripted_service([tool_call("lookup", key="a"), tool_call("lookup", key="b"), AIMessage(content="answer")])
+    service.execute("question", [lookup])
+    service.model.structured.append(Answer(files=[1]))
+    tokens_used = service.budget.tokens_used
+
+    assert service.get_structured_response("which files?", Answer) == Answer(files=[1])
+    assert service.budget.iterations == 3
+    assert service.budget.tokens_used > tokens_used
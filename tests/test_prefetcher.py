@@ -0,0 +1,79 @@
+import pytest
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+from app.ai.tools.prefetcher import FilePrefetcher
+from app.ai.tools.read_code import CodeReader
+
+FILES = {
+    ".gitignore": "",
+    "app/main.py": "from app.settings import TIMEOUT\n",
+    "app/settings.py": "TIMEOUT = 30\n",
+    "app/util.py": "def helper():\n    pass\n",
+}
+
+
+@pytest.fixture
+def reader(write_files):
+    reader = CodeReader(str(write_files(FILES)))
+    yield reader
+    reader.close()
+
+
+@pytest.fixture
+def prefetched(reader) -> list[int]:
+    """Indices handed to CodeReader.prefetch, in order."""
+    prefetched: list[int] = []
+    reader.prefetch = prefetched.extend
+    return prefetched
+
+
+@pytest.fixture
+def prefetcher(reader, prefetched) -> FilePrefetcher:
+    return FilePrefetcher(reader)
+
+
+def index_of(prefetcher: FilePrefetcher, relative_path: str) -> int:
+    return prefetcher.code_reader.relative_paths().index(relative_path)
+
+
+def args_chunk(args: str) -> AIMessageChunk:
+    return AIMessageChunk(content="", tool_call_chunks=[{"name": None, "args": args, "id": None, "index": 0}])
+
+
+def test_streamed_read_code_arguments_prefetch_complete_indices(prefetcher, prefetched):
+    prefetcher.observe_chunk(args_chunk('{"indices": [1'))
+    assert prefetched == []
+
+    prefetcher.observe_chunk(args_chunk(', 2'))
+    assert prefetched == [1]
+
+    prefetcher.observe_chunk(args_chunk(']}'))
+    assert prefetched == [1, 2]
+
+
+def test_streamed_text_prefetches_mentioned_files_once_complete(prefetcher, prefetched):
+    util = index_of(prefetcher, "app/util.py")
+
+    prefetcher.observe_chunk(AIMessageChunk(content=f"Let me check [{util}"))
+    assert prefetched == []
+
+    prefetcher.observe_chunk(AIMessageChunk(content="] and app/settings.py next"))
+    assert prefetched == [util, index_of(prefetcher, "app/settings.py")]
+
+
+def test_complete_step_resets_the_partial_reply(prefetcher, prefetched):
+    prefetcher.observe_chunk(args_chunk('{"indices": [1'))
+    prefetcher.observe(ToolMessage(content="", tool_call_id="1"))
+
+    prefetcher.observe_chunk(args_chunk(']}'))
+
+    assert prefetched == []
+
+
+def test_read_files_prefetch_their_imports(prefetcher, prefetched):
+    main = index_of(prefetcher, "app/main.py")
+    read_output = prefetcher.code_reader.read_files([main])
+
+    prefetcher.observe(ToolMessage(content=read_output, tool_call_id="1"))
+
+    assert prefetched == [index_of(prefetcher, "app/settings.py")]
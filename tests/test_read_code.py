@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.ai.tools.read_code import CodeReader
+from app.util.content_classifier import ContentClassifier
+from app.util.content_pack import PackedSource, open_pack
+
+MODULE_COUNT = 300
+
+
+def module_files() -> dict[str, str]:
+    files = {".gitignore": "*.log\n"}
+    files.update({f"pkg/module_{i}.py": f"VALUE = {i}\n" * 50 for i in range(MODULE_COUNT)})
+    return files
+
+
+def bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def build_pack(root: Path, pack_path: Path) -> None:
+    reader = CodeReader(str(root), pack_path=str(pack_path))
+    assert reader.pack_writer is not None
+    reader.pack_writer.join()
+    reader.close()
+
+
+def test_pack_is_rewritten_on_close_without_losing_files(write_files, tmp_path):
+    root = write_files(module_files())
+    pack_path = tmp_path / "repo.pack"
+    build_pack(root, pack_path)
+    (root / "pkg" / "module_0.py").write_text("VALUE = -1\n")
+    bump_mtime(root / "pkg" / "module_0.py")
+
+    reader = CodeReader(str(root), pack_path=str(pack_path))
+    assert reader.pack_writer is None
+    reader.read_file(reader.relative_paths().index("pkg/module_0.py"))
+    reader.close()
+    assert reader.pack_writer is not None
+    reader.pack_writer.join()
+
+    pack = open_pack(pack_path, str(root))
+    assert pack is not None
+    assert len(pack.entries) == MODULE_COUNT + 1
+    assert bytes(pack.read_bytes("pkg/module_0.py")) == b"VALUE = -1\n"
+    pack.close()
+
+
+def test_warm_start_reuses_saved_classifications(write_files, tmp_path):
+    root = write_files({**module_files(), "uv.lock": "version = 1\n"})
+    pack_path = tmp_path / "repo.pack"
+    build_pack(root, pack_path)
+
+    reader = CodeReader(str(root), pack_path=str(pack_path), classifier=ContentClassifier())
+
+    assert list(reader.demoted.values()) == ["lockfile"]
+    assert isinstance(reader.source, PackedSource)
+    assert not reader.source._validated
+    reader.close()
+
+
+def slow_reader(root: Path, blocked: dict[str, threading.Event], max_workers: int = 8) -> tuple[CodeReader, list[str]]:
+    """A reader whose reads of the given files wait for their event; returns it with the log of reads."""
+    reader = CodeReader(str(root), max_workers=max_workers)
+    reads: list[str] = []
+    read_text = reader.source.read_text
+
+    def read(file_path: Path) -> str:
+        relative_path = file_path.relative_to(root).as_posix()
+        reads.append(relative_path)
+        if relative_path in blocked:
+            assert blocked[relative_path].wait(5)
+        return read_text(file_path)
+
+    reader.source.read_text = read
+    return reader, reads
+
+
+def test_read_files_keeps_order_and_reports_bad_indices(write_files):
+    root = write_files(module_files())
+    reader = CodeReader(str(root))
+    first, second = reader.relative_paths().index("pkg/module_1.py"), reader.relative_paths().index("pkg/module_2.py")
+
+    output = reader.read_files([second, 10_000, first])
+
+    assert output.index('path="pkg/module_2.py"') < output.index("Invalid index: 10000") < output.index('path="pkg/module_1.py"')
+    reader.close()
+
+
+def test_read_files_reads_concurrently(write_files):
+    root = write_files(module_files())
+    barrier = threading.Barrier(3, timeout=5)
+    reader = CodeReader(str(root))
+    read_text = reader.source.read_text
+
+    def read_together(file_path: Path) -> str:
+        # Only returns once three reads are in flight at the same time
+        barrier.wait()
+        return read_text(file_path)
+
+    reader.source.read_text = read_together
+
+    output = reader.read_files([1, 2, 3])
+
+    assert "Error reading file" not in output
+    reader.close()
+
+
+def test_read_cancels_a_queued_prefetch(write_files):
+    root = write_files(module_files())
+    release = threading.Event()
+    reader, reads = slow_reader(root, {"pkg/module_0.py": release}, max_workers=2)
+    busy, queued = reader.relative_paths().index("pkg/module_0.py"), reader.relative_paths().index("pkg/module_1.py")
+    reader.prefetch([busy, queued])
+
+    assert reader.read_file(queued) == "VALUE = 1\n" * 50
+    release.set()
+    reader._prefetch_executor.shutdown(wait=True)
+
+    assert reads.count("pkg/module_1.py") == 1
+    reader.close()
+
+
+def test_read_waits_for_a_running_prefetch(write_files):
+    root = write_files(module_files())
+    release = threading.Event()
+    reader, reads = slow_reader(root, {"pkg/module_0.py": release})
+    index = reader.relative_paths().index("pkg/module_0.py")
+    reader.prefetch([index])
+    while "pkg/module_0.py" not in reads:
+        time.sleep(0.01)
+    threading.Timer(0.1, release.set).start()
+
+    assert reader.read_file(index) == "VALUE = 0\n" * 50
+    assert reads.count("pkg/module_0.py") == 1
+    reader.close()
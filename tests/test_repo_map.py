@@ -0,0 +1,77 @@
+from contextlib import closing
+
+from app.ai.tools.read_code import CodeReader
+from app.ai.tools.repo_map import RepoMap, extract_symbols
+from app.util.import_graph import ImportCache
+
+FILES = {
+    ".gitignore": "",
+    "pkg/__init__.py": "",
+    "pkg/core.py": "class Engine:\n    def run(self):\n        pass\n\ndef helper():\n    pass\n",
+    "pkg/a.py": "from pkg.core import Engine\n",
+    "pkg/b.py": "from pkg import core\n",
+    "pkg/c.py": "import pkg.core\nfrom pkg import a\n",
+}
+
+
+def test_central_files_rank_first(write_files):
+    root = write_files(FILES)
+    reader = CodeReader(str(root))
+    repo_map = RepoMap(reader, import_cache=ImportCache())
+
+    top = [reader.relative_path(index) for index in repo_map.top_files(3)]
+
+    assert top[0] == "pkg/core.py"
+    assert set(top[1:]) == {"pkg/__init__.py", "pkg/a.py"}
+    assert repo_map.render().splitlines()[0].endswith("pkg/core.py (imported by 3): Engine(run), helper")
+    reader.close()
+
+
+def test_parsed_imports_are_cached(write_files):
+    root = write_files(FILES)
+    reader = CodeReader(str(root))
+    import_cache = ImportCache()
+    RepoMap(reader, import_cache=import_cache).get_scores()
+    read = []
+    reader.source.read_text = lambda file_path: read.append(file_path)
+
+    (_, import_counts), complete = RepoMap(reader, import_cache=import_cache)._compute_scores()
+
+    assert complete
+    assert read == []
+    assert import_counts[reader.relative_paths().index("pkg/core.py")] == 3
+    reader.close()
+
+
+def test_parse_budget_leaves_files_out(write_files):
+    root = write_files(FILES)
+    reader = CodeReader(str(root))
+    repo_map = RepoMap(reader, import_cache=ImportCache(), max_parse_seconds=0)
+
+    _, import_counts = repo_map.get_scores()
+
+    assert import_counts.sum() == 0
+    assert repo_map._partial is not None
+    reader.close()
+
+
+def test_map_contents_reads_lazily(write_files):
+    root = write_files({f"m{i}.py": f"X = {i}\n" for i in range(100)})
+    reader = CodeReader(str(root), max_workers=2)
+    read = []
+    read_text = reader.source.read_text
+    reader.source.read_text = lambda file_path: read.append(file_path) or read_text(file_path)
+
+    with closing(reader.map_contents(list(range(100)))) as contents:
+        first = next(contents)
+
+    assert first == (0, reader.relative_path(0), reader.source.read_text(reader.file_paths[0]))
+    reader._executor.shutdown(wait=True)
+    assert len(read) < 10
+    reader.close()
+
+
+def test_extract_symbols():
+    assert extract_symbols("web/app.ts", "export default class App {}\nexport const x = 1\n") == ["App", "x"]
+    assert extract_symbols("main.go", "func (s *Server) Start() {}\ntype Server struct{}\n") == ["Start", "Server"]
+    assert extract_symbols("README.md", "# Title\n") == []